@@ -1,9 +1,25 @@
 import streamlit as st
 import pandas as pd
-import pickle
-import numpy as np
+import altair as alt
+import os
 from datetime import datetime
 
+from instrumentation import get_metrics
+from job_queue import get_job_queue
+from outcomes import is_dropout
+from prediction_cache import get_prediction_cache
+from predictor import StudentPredictor
+from similar_students import get_index
+from validation import FIELD_BOUNDS
+from whatif import SWEEP_FIELDS, axis_values, sweep
+
+CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'style.css')
+JOB_POLL_SECONDS = 1.0
+JOB_STATES = {
+    'queued': "Menunggu", 'running': "Berjalan", 'done': "Selesai",
+    'failed': "Gagal", 'cancelled': "Dibatalkan", 'interrupted': "Terhenti",
+}
+
 # Set page configuration
 st.set_page_config(
     page_title="Prediktor Risiko Dropout Siswa",
@@ -12,392 +28,13 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS for better styling
-st.markdown("""
-    <style>
-    /* Main container styling */
-    .main {
-        padding: 2rem;
-        background-color: #f0f2f6;
-    }
-    
-    /* Button styling */
-    .stButton>button {
-        width: 100%;
-        background-color: #4a90e2;
-        color: #ffffff;
-        padding: 1rem;
-        border-radius: 8px;
-        font-size: 1.2rem;
-        font-weight: 600;
-        border: none;
-        transition: all 0.3s ease;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-    }
-    .stButton>button:hover {
-        background-color: #357abd;
-        transform: translateY(-2px);
-        box-shadow: 0 4px 8px rgba(0,0,0,0.15);
-    }
-    
-    /* Prediction box styling */
-    .prediction-box {
-        padding: 2rem;
-        border-radius: 12px;
-        margin: 1.5rem 0;
-        box-shadow: 0 4px 6px rgba(0,0,0,0.05);
-        background-color: #ffffff;
-    }
-    
-    /* Section headers */
-    .section-header {
-        color: #2c3e50;
-        font-size: 1.8rem;
-        font-weight: 700;
-        margin-bottom: 1.2rem;
-        padding-bottom: 0.8rem;
-        border-bottom: 3px solid #4a90e2;
-    }
-    
-    /* Info text */
-    .info-text {
-        color: #2c3e50;
-        font-size: 1.1rem;
-        margin-bottom: 1.2rem;
-        line-height: 1.5;
-    }
-    
-    /* Form elements */
-    .stSelectbox, .stNumberInput {
-        margin-bottom: 1.2rem;
-    }
-    
-    /* Input fields */
-    .stSelectbox > div > div {
-        background-color: #ffffff;
-        border: 2px solid #4a90e2;
-        border-radius: 6px;
-    }
-    
-    .stNumberInput > div > div > input {
-        background-color: #ffffff;
-        border: 2px solid #4a90e2;
-        border-radius: 6px;
-        color: #2c3e50;
-    }
-    
-    /* Sidebar styling */
-    .css-1d391kg {
-        background-color: #2c3e50;
-        color: #ffffff;
-    }
-    
-    .sidebar .sidebar-content {
-        background-color: #2c3e50;
-    }
-    
-    /* Card styling */
-    .card {
-        background-color: #ffffff;
-        border-radius: 12px;
-        padding: 1.5rem;
-        margin-bottom: 1.5rem;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-    }
-    
-    /* Title styling */
-    h1 {
-        color: #2c3e50;
-        font-size: 2.5rem;
-        font-weight: 700;
-        margin-bottom: 1.5rem;
-        text-align: center;
-    }
-    
-    /* Help text styling */
-    .help-text {
-        color: #7f8c8d;
-        font-size: 0.9rem;
-        font-style: italic;
-    }
-    
-    /* Success message styling */
-    .success-message {
-        background-color: #e8f5e9;
-        border: 2px solid #2e7d32;
-        color: #1b5e20;
-    }
-    
-    /* Warning message styling */
-    .warning-message {
-        background-color: #fff3e0;
-        border: 2px solid #ef6c00;
-        color: #e65100;
-    }
-
-    /* Fix for selectbox text color */
-    .stSelectbox > div > div > div {
-        color: #2c3e50 !important;
-    }
-
-    /* Fix for number input text color */
-    .stNumberInput > div > div > input {
-        color: #2c3e50 !important;
-    }
-
-    /* Fix for sidebar text color */
-    .sidebar .sidebar-content .stMarkdown {
-        color: #ffffff !important;
-    }
-
-    /* Fix for form labels */
-    .stForm label {
-        color: #2c3e50 !important;
-        font-weight: 600 !important;
-    }
-
-    /* Fix for selectbox options */
-    .stSelectbox [data-baseweb="select"] {
-        color: #2c3e50 !important;
-    }
-
-    /* Fix for number input labels */
-    .stNumberInput label {
-        color: #2c3e50 !important;
-        font-weight: 600 !important;
-    }
-
-    /* Fix for sidebar headers */
-    .sidebar h1, .sidebar h2, .sidebar h3 {
-        color: #ffffff !important;
-        font-weight: 700 !important;
-    }
-
-    /* Fix for sidebar paragraphs */
-    .sidebar p {
-        color: #ffffff !important;
-        font-weight: 500 !important;
-    }
-
-    /* Fix for sidebar lists */
-    .sidebar ul, .sidebar ol {
-        color: #ffffff !important;
-        font-weight: 500 !important;
-    }
-
-    /* Fix for form section headers */
-    .section-header {
-        color: #2c3e50 !important;
-        font-weight: 700 !important;
-    }
-
-    /* Fix for form info text */
-    .info-text {
-        color: #2c3e50 !important;
-        font-weight: 500 !important;
-    }
-
-    /* Fix for selectbox dropdown text */
-    .stSelectbox [data-baseweb="popover"] {
-        color: #2c3e50 !important;
-    }
-
-    /* Fix for number input value text */
-    .stNumberInput [data-baseweb="input"] {
-        color: #2c3e50 !important;
-    }
-
-    /* Fix for selectbox dropdown background */
-    .stSelectbox [data-baseweb="popover"] {
-        background-color: #ffffff !important;
-    }
-
-    /* Fix for selectbox option hover */
-    .stSelectbox [data-baseweb="option"]:hover {
-        background-color: #e8eaf6 !important;
-    }
-
-    /* Fix for selectbox selected option */
-    .stSelectbox [data-baseweb="option"][aria-selected="true"] {
-        background-color: #c5cae9 !important;
-        color: #2c3e50 !important;
-    }
-
-    /* Fix for number input focus */
-    .stNumberInput [data-baseweb="input"]:focus {
-        border-color: #4a90e2 !important;
-        box-shadow: 0 0 0 2px rgba(74, 144, 226, 0.2) !important;
-    }
-
-    /* Fix for selectbox focus */
-    .stSelectbox [data-baseweb="select"]:focus {
-        border-color: #4a90e2 !important;
-        box-shadow: 0 0 0 2px rgba(74, 144, 226, 0.2) !important;
-    }
-
-    /* Main background */
-    .stApp {
-        background-color: #f0f2f6;
-    }
-
-    /* Form background */
-    .stForm {
-        background-color: #ffffff;
-        padding: 2rem;
-        border-radius: 12px;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-    }
-
-    /* Section background */
-    .section-background {
-        background-color: #ffffff;
-        padding: 1.5rem;
-        border-radius: 8px;
-        margin-bottom: 1.5rem;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-    }
-
-    /* Semester section styling */
-    .semester-section {
-        background-color: #e8f0fe;
-        padding: 1.5rem;
-        border-radius: 8px;
-        margin-bottom: 1rem;
-        border: 1px solid #4a90e2;
-    }
-
-    .semester-section h4 {
-        color: #2c3e50;
-        font-size: 1.4rem;
-        font-weight: 600;
-        margin-bottom: 1rem;
-        padding-bottom: 0.5rem;
-        border-bottom: 2px solid #4a90e2;
-    }
-
-    /* Update the semester headers in the form */
-    .stMarkdown h4 {
-        background-color: #e8f0fe;
-        padding: 1rem;
-        border-radius: 8px;
-        color: #2c3e50 !important;
-        font-weight: 600 !important;
-        margin-bottom: 1rem !important;
-        border: 1px solid #4a90e2;
-    }
-
-    /* Popup styling */
-    .popup-overlay {
-        position: fixed;
-        top: 0;
-        left: 0;
-        right: 0;
-        bottom: 0;
-        background-color: rgba(0, 0, 0, 0.7);
-        display: flex;
-        justify-content: center;
-        align-items: center;
-        z-index: 1000;
-        animation: fadeIn 0.3s ease-in-out;
-    }
-
-    .popup-content {
-        background-color: #ffffff;
-        padding: 2rem;
-        border-radius: 12px;
-        box-shadow: 0 4px 20px rgba(0, 0, 0, 0.2);
-        max-width: 600px;
-        width: 90%;
-        animation: slideIn 0.3s ease-in-out;
-    }
-
-    .popup-title {
-        font-size: 2rem;
-        font-weight: 700;
-        margin-bottom: 1.5rem;
-        text-align: center;
-        padding-bottom: 1rem;
-        border-bottom: 3px solid;
-    }
-
-    .popup-title.success {
-        color: #1b5e20;
-        border-color: #2e7d32;
-    }
-
-    .popup-title.warning {
-        color: #b71c1c;
-        border-color: #c62828;
-    }
-
-    .popup-message {
-        font-size: 1.2rem;
-        margin-bottom: 1.5rem;
-        text-align: center;
-        line-height: 1.6;
-    }
-
-    .popup-message.success {
-        color: #1b5e20;
-    }
-
-    .popup-message.warning {
-        color: #b71c1c;
-    }
-
-    .popup-actions {
-        text-align: center;
-        margin-top: 2rem;
-    }
-
-    .popup-button {
-        padding: 1rem 2.5rem;
-        border-radius: 8px;
-        border: none;
-        font-size: 1.2rem;
-        font-weight: 600;
-        cursor: pointer;
-        transition: all 0.3s ease;
-    }
-
-    .popup-button.success {
-        background-color: #2e7d32;
-        color: white;
-    }
-
-    .popup-button.warning {
-        background-color: #c62828;
-        color: white;
-    }
+# Styles live in static/style.css; read once per process, not on every rerun
+@st.cache_resource
+def load_css(path=CSS_PATH):
+    with open(path) as f:
+        return f"<style>{f.read()}</style>"
 
-    .popup-button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 4px 8px rgba(0, 0, 0, 0.2);
-    }
-
-    .popup-list {
-        text-align: left;
-        margin: 1rem 0;
-        padding-left: 2rem;
-    }
-
-    .popup-list li {
-        margin-bottom: 0.8rem;
-        color: #b71c1c;
-        font-size: 1.1rem;
-    }
-
-    @keyframes fadeIn {
-        from { opacity: 0; }
-        to { opacity: 1; }
-    }
-
-    @keyframes slideIn {
-        from { transform: translateY(-20px); opacity: 0; }
-        to { transform: translateY(0); opacity: 1; }
-    }
-    </style>
-    """, unsafe_allow_html=True)
+st.markdown(load_css(), unsafe_allow_html=True)
 
 # Sidebar with information
 with st.sidebar:
@@ -435,100 +72,6 @@ with st.sidebar:
 if 'show_popup' not in st.session_state:
     st.session_state.show_popup = False
 
-class StudentPredictor:
-    def __init__(self):
-        self.model = None
-        self.feature_names = [
-            'Application_mode', 'Course', 'Previous_qualification_grade',
-            'Mothers_qualification', 'Fathers_qualification',
-            'Mothers_occupation', 'Fathers_occupation', 'Admission_grade',
-            'Displaced', 'Gender', 'Scholarship_holder', 'Age_at_enrollment',
-            'Curricular_units_1st_sem_enrolled', 'Curricular_units_1st_sem_evaluations',
-            'Curricular_units_1st_sem_approved', 'Curricular_units_2nd_sem_enrolled',
-            'Curricular_units_2nd_sem_evaluations', 'Curricular_units_2nd_sem_approved',
-            'Unemployment_rate', 'Inflation_rate', 'GDP', 'Status',
-            'Ratio_approved_1st_sem', 'Ratio_approved_2nd_sem'
-        ]
-        # Features that need encoding
-        self.categorical_features = [
-            'Application_mode', 'Course', 'Mothers_qualification',
-            'Fathers_qualification', 'Mothers_occupation', 'Fathers_occupation',
-            'Displaced', 'Gender', 'Scholarship_holder', 'Status'
-        ]
-
-    def load_model(self):
-        try:
-            with open('model.pkl', 'rb') as f:
-                self.model = pickle.load(f)
-            return True
-        except Exception as e:
-            st.error(f"Error loading model: {str(e)}")
-            return False
-
-    def prepare_input_data(self, form_data):
-        # Create a DataFrame from the form data
-        input_df = pd.DataFrame([form_data], columns=self.feature_names)
-        
-        # Define the expected categories for each feature
-        expected_categories = {
-            'Application_mode': [15, 9254],
-            'Course': [9254, 9853],
-            'Mothers_qualification': [1, 2, 3],
-            'Fathers_qualification': [3, 4, 5],
-            'Mothers_occupation': [1, 2, 3],
-            'Fathers_occupation': [1, 2, 3],
-            'Displaced': [0, 1],
-            'Gender': [0, 1],
-            'Scholarship_holder': [0, 1],
-            'Status': [0, 1]
-        }
-        
-        # Create binary columns for categorical features
-        for feature in self.categorical_features:
-            # Create binary columns for each expected category
-            for value in expected_categories[feature]:
-                col_name = f"{feature}_{value}"
-                input_df[col_name] = (input_df[feature] == value).astype(int)
-            
-            # Drop the original categorical column
-            input_df = input_df.drop(columns=[feature])
-        
-        # Ensure we have exactly 259 features
-        expected_features = 259
-        current_features = input_df.shape[1]
-        
-        if current_features < expected_features:
-            # Add missing features with zeros
-            missing_features = expected_features - current_features
-            for i in range(missing_features):
-                input_df[f'missing_feature_{i}'] = 0
-        elif current_features > expected_features:
-            # Keep only the first 259 features
-            input_df = input_df.iloc[:, :expected_features]
-        
-        return input_df
-
-    def predict(self, input_data):
-        if self.model is None:
-            return None
-        
-        try:
-            # Ensure input_data has exactly 259 features
-            if input_data.shape[1] != 259:
-                st.error(f"Expected 259 features but got {input_data.shape[1]}")
-                return None
-                
-            # Suppress any warnings
-            import warnings
-            with warnings.catch_warnings():
-                warnings.filterwarnings("ignore")
-                result = self.model.predict(input_data)[0]
-                
-            return str(result)  # Convert to string for consistency
-        except Exception as e:
-            st.error(f"Error during prediction: {str(e)}")
-            return None
-
 def create_input_form():
     with st.form("student_form"):
         st.markdown('<div class="section-header">Informasi Akademik</div>', unsafe_allow_html=True)
@@ -551,15 +94,15 @@ def create_input_form():
             )
             previous_qualification_grade = st.number_input(
                 "Nilai Kualifikasi Sebelumnya",
-                min_value=0.0,
-                max_value=200.0,
+                min_value=FIELD_BOUNDS['Previous_qualification_grade'][0],
+                max_value=FIELD_BOUNDS['Previous_qualification_grade'][1],
                 value=160.0,
                 help="Nilai dari kualifikasi sebelumnya (0-200)"
             )
             admission_grade = st.number_input(
                 "Nilai Penerimaan",
-                min_value=0.0,
-                max_value=200.0,
+                min_value=FIELD_BOUNDS['Admission_grade'][0],
+                max_value=FIELD_BOUNDS['Admission_grade'][1],
                 value=142.5,
                 help="Nilai saat diterima (0-200)"
             )
@@ -616,8 +159,8 @@ def create_input_form():
             )
             age_at_enrollment = st.number_input(
                 "Usia Saat Mendaftar",
-                min_value=17,
-                max_value=100,
+                min_value=FIELD_BOUNDS['Age_at_enrollment'][0],
+                max_value=FIELD_BOUNDS['Age_at_enrollment'][1],
                 value=19,
                 help="Usia siswa saat mendaftar"
             )
@@ -631,22 +174,22 @@ def create_input_form():
             )
             unemployment_rate = st.number_input(
                 "Tingkat Pengangguran (%)",
-                min_value=0.0,
-                max_value=100.0,
+                min_value=FIELD_BOUNDS['Unemployment_rate'][0],
+                max_value=FIELD_BOUNDS['Unemployment_rate'][1],
                 value=13.9,
                 help="Tingkat pengangguran saat ini dalam persentase"
             )
             inflation_rate = st.number_input(
                 "Tingkat Inflasi (%)",
-                min_value=-100.0,
-                max_value=100.0,
+                min_value=FIELD_BOUNDS['Inflation_rate'][0],
+                max_value=FIELD_BOUNDS['Inflation_rate'][1],
                 value=-0.3,
                 help="Tingkat inflasi saat ini dalam persentase"
             )
             gdp = st.number_input(
                 "PDB (dalam jutaan)",
-                min_value=0.0,
-                max_value=100000.0,
+                min_value=FIELD_BOUNDS['GDP'][0],
+                max_value=FIELD_BOUNDS['GDP'][1],
                 value=0.79,
                 help="PDB saat ini dalam jutaan"
             )
@@ -660,32 +203,32 @@ def create_input_form():
             st.markdown('<div class="semester-section"><h4>Semester Pertama</h4></div>', unsafe_allow_html=True)
             curricular_units_1st_sem_enrolled = st.number_input(
                 "Unit yang Diambil",
-                min_value=0,
-                max_value=20,
+                min_value=FIELD_BOUNDS['Curricular_units_1st_sem_enrolled'][0],
+                max_value=FIELD_BOUNDS['Curricular_units_1st_sem_enrolled'][1],
                 value=6,
                 key="1st_enrolled",
                 help="Jumlah unit kurikuler yang diambil di semester pertama"
             )
             curricular_units_1st_sem_evaluations = st.number_input(
                 "Unit yang Dievaluasi",
-                min_value=0,
-                max_value=20,
+                min_value=FIELD_BOUNDS['Curricular_units_1st_sem_evaluations'][0],
+                max_value=FIELD_BOUNDS['Curricular_units_1st_sem_evaluations'][1],
                 value=6,
                 key="1st_evaluations",
                 help="Jumlah unit kurikuler yang dievaluasi di semester pertama"
             )
             curricular_units_1st_sem_approved = st.number_input(
                 "Unit yang Lulus",
-                min_value=0,
-                max_value=20,
+                min_value=FIELD_BOUNDS['Curricular_units_1st_sem_approved'][0],
+                max_value=FIELD_BOUNDS['Curricular_units_1st_sem_approved'][1],
                 value=6,
                 key="1st_approved",
                 help="Jumlah unit kurikuler yang lulus di semester pertama"
             )
             ratio_approved_1st_sem = st.number_input(
                 "Rasio Kelulusan",
-                min_value=0.0,
-                max_value=1.0,
+                min_value=FIELD_BOUNDS['Ratio_approved_1st_sem'][0],
+                max_value=FIELD_BOUNDS['Ratio_approved_1st_sem'][1],
                 value=1.0,
                 key="1st_ratio",
                 help="Rasio unit yang lulus di semester pertama"
@@ -695,32 +238,32 @@ def create_input_form():
             st.markdown('<div class="semester-section"><h4>Semester Kedua</h4></div>', unsafe_allow_html=True)
             curricular_units_2nd_sem_enrolled = st.number_input(
                 "Unit yang Diambil",
-                min_value=0,
-                max_value=20,
+                min_value=FIELD_BOUNDS['Curricular_units_2nd_sem_enrolled'][0],
+                max_value=FIELD_BOUNDS['Curricular_units_2nd_sem_enrolled'][1],
                 value=6,
                 key="2nd_enrolled",
                 help="Jumlah unit kurikuler yang diambil di semester kedua"
             )
             curricular_units_2nd_sem_evaluations = st.number_input(
                 "Unit yang Dievaluasi",
-                min_value=0,
-                max_value=20,
+                min_value=FIELD_BOUNDS['Curricular_units_2nd_sem_evaluations'][0],
+                max_value=FIELD_BOUNDS['Curricular_units_2nd_sem_evaluations'][1],
                 value=6,
                 key="2nd_evaluations",
                 help="Jumlah unit kurikuler yang dievaluasi di semester kedua"
             )
             curricular_units_2nd_sem_approved = st.number_input(
                 "Unit yang Lulus",
-                min_value=0,
-                max_value=20,
+                min_value=FIELD_BOUNDS['Curricular_units_2nd_sem_approved'][0],
+                max_value=FIELD_BOUNDS['Curricular_units_2nd_sem_approved'][1],
                 value=6,
                 key="2nd_approved",
                 help="Jumlah unit kurikuler yang lulus di semester kedua"
             )
             ratio_approved_2nd_sem = st.number_input(
                 "Rasio Kelulusan",
-                min_value=0.0,
-                max_value=1.0,
+                min_value=FIELD_BOUNDS['Ratio_approved_2nd_sem'][0],
+                max_value=FIELD_BOUNDS['Ratio_approved_2nd_sem'][1],
                 value=1.0,
                 key="2nd_ratio",
                 help="Rasio unit yang lulus di semester kedua"
@@ -757,9 +300,25 @@ def create_input_form():
             }
     return None
 
-def display_prediction(prediction):
-    if prediction == '1':
-        st.markdown("""
+def explanation_html(explanation, color):
+    if not explanation or not explanation['factors']:
+        return ""
+    # Contributions are in probability points for the predicted class.
+    # Kept on one line: a blank line would end the popup's HTML block.
+    items = "".join(
+        f"<li>{field.replace('_', ' ')}: {value * 100:+.1f} poin</li>"
+        for field, value in explanation['factors']
+    )
+    return (
+        f'<p class="popup-message" style="color: {color}; margin-top: 1rem;">'
+        f"Faktor yang paling memengaruhi prediksi (keyakinan model "
+        f"{explanation['probability']:.0%}, rata-rata {explanation['base']:.0%}):</p>"
+        f'<ul class="popup-list" style="font-size: 0.95rem;">{items}</ul>'
+    )
+
+def display_prediction(prediction, explanation=None):
+    if not is_dropout(prediction):
+        st.markdown(f"""
             <div class="popup-overlay" id="prediction-popup">
                 <div class="popup-content">
                     <h2 class="popup-title success">🎓 Risiko Dropout Rendah</h2>
@@ -769,6 +328,7 @@ def display_prediction(prediction):
                     <p class="popup-message success">
                         Tetap pantau kemajuan mereka dan berikan dukungan sesuai kebutuhan.
                     </p>
+                    {explanation_html(explanation, '#1b5e20')}
                     <div class="popup-actions">
                         <p style="color: #1b5e20; font-size: 1.1rem; margin-top: 1rem;">
                             Silakan refresh browser Anda untuk melakukan prediksi baru
@@ -778,7 +338,7 @@ def display_prediction(prediction):
             </div>
         """, unsafe_allow_html=True)
     else:
-        st.markdown("""
+        st.markdown(f"""
             <div class="popup-overlay" id="prediction-popup">
                 <div class="popup-content">
                     <h2 class="popup-title warning">⚠️ Risiko Dropout Tinggi</h2>
@@ -794,6 +354,7 @@ def display_prediction(prediction):
                         <li>Pertimbangkan layanan dukungan tambahan</li>
                         <li>Pantau kemajuan secara ketat</li>
                     </ul>
+                    {explanation_html(explanation, '#b71c1c')}
                     <div class="popup-actions">
                         <p style="color: #b71c1c; font-size: 1.1rem; margin-top: 1rem;">
                             Silakan refresh browser Anda untuk melakukan prediksi baru
@@ -803,6 +364,236 @@ def display_prediction(prediction):
             </div>
         """, unsafe_allow_html=True)
 
+def bulk_scoring_section(jobs):
+    st.markdown('<div class="section-header">Prediksi Massal</div>', unsafe_allow_html=True)
+    st.markdown(
+        '<div class="info-text">Unggah file CSV dengan kolom seperti data_agum.csv. '
+        'File diproses per chunk di latar belakang, jadi halaman boleh dimuat ulang '
+        'atau ditutup selama pemrosesan berjalan.</div>',
+        unsafe_allow_html=True
+    )
+
+    uploaded = st.file_uploader("File CSV Siswa", type="csv")
+    chunksize = st.number_input(
+        "Ukuran Chunk",
+        min_value=100,
+        max_value=200000,
+        value=10000,
+        step=1000,
+        help="Jumlah baris yang diprediksi dalam satu kali pemanggilan model"
+    )
+
+    explain = st.checkbox("Sertakan faktor utama tiap siswa",
+                          help="Menambah kolom Faktor_Utama berisi 3 faktor yang paling memengaruhi prediksi")
+
+    if uploaded is not None and st.button("Prediksi Semua Siswa"):
+        # Scored on a background worker; the job id in the URL survives a reload
+        job_id = jobs.submit(uploaded, uploaded.name, chunksize=int(chunksize),
+                             explain_top=3 if explain else 0)
+        st.query_params['job'] = job_id
+
+    recent = jobs.jobs(limit=10)
+    if recent:
+        with st.expander("Riwayat Pekerjaan"):
+            labels = {job['id']: f"{job['name']} ({JOB_STATES[job['state']]}, {job['id']})" for job in recent}
+            chosen = st.selectbox("Pekerjaan", options=list(labels), format_func=labels.get)
+            if st.button("Tampilkan"):
+                st.query_params['job'] = chosen
+
+    job_id = st.query_params.get('job')
+    job = jobs.status(job_id) if job_id else None
+    if job is not None:
+        display_job(jobs, job)
+
+def job_progress(jobs, job_id):
+    # Polled as a fragment: only this block reruns until the job finishes
+    job = jobs.status(job_id)
+    if job['state'] not in ('queued', 'running'):
+        st.rerun()
+    st.markdown(f"**{job['name']}** &middot; {JOB_STATES[job['state']]}")
+    st.progress(job['progress'], text=f"{job['rows']:,} baris diproses")
+    if st.button("Batalkan"):
+        jobs.cancel(job_id)
+        st.rerun()
+
+def display_job(jobs, job):
+    if job['state'] in ('queued', 'running'):
+        st.fragment(job_progress, run_every=JOB_POLL_SECONDS)(jobs, job['id'])
+        return
+
+    st.markdown(f"**{job['name']}** &middot; {JOB_STATES[job['state']]}")
+    if job['state'] == 'failed':
+        st.error(f"Error during prediction: {job['error']}")
+        return
+    if job['state'] != 'done':
+        st.warning(f"Pekerjaan berhenti setelah {job['rows']:,} baris.")
+        return
+
+    summary = job['summary']
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Total Baris", f"{summary['rows']:,}")
+    col2.metric("Throughput", f"{summary['rows_per_second']:,.0f} baris/detik")
+    col3.metric("Latensi per Baris", f"{summary['row_latency_ms_mean']:.3f} ms",
+                help=f"p95 per chunk: {summary['row_latency_ms_p95']:.3f} ms")
+
+    # Jobs from before validation existed have no rejected count
+    if summary.get('rejected'):
+        st.warning(f"{summary['rejected']:,} baris ditolak karena tidak lolos validasi input; "
+                   f"alasannya ada di kolom Alasan_Ditolak.")
+        rejected = pd.DataFrame(
+            [(field, reason, count) for field, reasons in summary['rejected_by_field'].items()
+             for reason, count in reasons.items()],
+            columns=['Fitur', 'Alasan', 'Jumlah'],
+        )
+        st.dataframe(rejected, use_container_width=True, hide_index=True)
+
+    result_path = jobs.result_path(job['id'])
+    if summary['rows']:
+        st.dataframe(pd.read_csv(result_path, nrows=100), use_container_width=True, hide_index=True)
+    with open(result_path, 'rb') as f:
+        st.download_button(
+            "Unduh Hasil Prediksi",
+            data=f,
+            file_name=f"prediksi_{job['name']}",
+            mime="text/csv"
+        )
+
+def display_model_info(stats, cache_stats):
+    st.sidebar.markdown(f"""
+        <div style='color: #ecf0f1; font-size: 0.8rem; margin-top: 1rem;'>
+            Model versi {stats['version'][:12]} &middot;
+            dimuat dalam {stats['load_seconds']:.2f} detik &middot;
+            {stats['memory_mb']:.1f} MB<br>
+            Cache prediksi: {cache_stats['hits']} hit, {cache_stats['misses']} miss,
+            {cache_stats['evictions']} eviction ({cache_stats['size']}/{cache_stats['maxsize']})
+        </div>
+    """, unsafe_allow_html=True)
+
+def display_drift_panel(drift):
+    # Same admin view as the metrics panel
+    report = drift.report()
+    with st.sidebar.expander("Drift Data Input", expanded=False):
+        st.text(f"{report['count']:,} prediksi dibandingkan dengan data latih")
+        if report['count']:
+            st.dataframe(pd.DataFrame([
+                {'Field': field, 'Rata-rata Latih': r['reference_mean'], 'Rata-rata': r['mean'],
+                 'PSI': r['psi'], 'KS': r['ks'], 'Status': r['status']}
+                for field, r in report['fields'].items()
+            ]), hide_index=True, use_container_width=True)
+
+def display_metrics_panel(metrics, drift=None):
+    # Admin view: open the app with ?admin=1 or set SHOW_METRICS_PANEL=1
+    if st.query_params.get('admin') != '1' and os.environ.get('SHOW_METRICS_PANEL') != '1':
+        return
+    snapshot = metrics.snapshot()
+    with st.sidebar.expander("Instrumentasi", expanded=False):
+        if snapshot['stages']:
+            stages = pd.DataFrame([
+                {'Tahap': stage, 'Jumlah': s['count'], 'p50 (ms)': s['p50_ms'],
+                 'p95 (ms)': s['p95_ms'], 'p99 (ms)': s['p99_ms'], 'Puncak (MB)': s['peak_mb']}
+                for stage, s in sorted(snapshot['stages'].items())
+            ])
+            st.dataframe(stages, hide_index=True, use_container_width=True)
+        for name, value in sorted(snapshot['counters'].items()):
+            st.text(f"{name}: {value:,}")
+        st.download_button("Unduh Metrik (Prometheus)", data=metrics.render_prometheus(),
+                           file_name="metrics.prom", mime="text/plain")
+    if drift is not None:
+        display_drift_panel(drift)
+
+def display_similar_students(neighbours):
+    st.markdown('<div class="section-header">Siswa Serupa dari Data Historis</div>', unsafe_allow_html=True)
+    outcomes = neighbours['Status'].value_counts()
+    summary = ', '.join(f"{count} {status}" for status, count in outcomes.items())
+    st.markdown(
+        f'<div class="info-text">Hasil akhir {len(neighbours)} siswa paling mirip: {summary}</div>',
+        unsafe_allow_html=True
+    )
+    st.dataframe(neighbours, use_container_width=True, hide_index=True)
+
+# Fragments: submitting the form reruns only this section, not the whole page
+@st.fragment
+def single_prediction_section(predictor, metrics):
+    form_data = create_input_form()
+    
+    if form_data is not None:
+        with st.spinner("Menganalisis data siswa..."):
+            with metrics.timer('form_to_label'):
+                prediction = predictor.predict_form(form_data)
+            
+            if prediction is not None:
+                explanation = predictor.explain(predictor.prepare_input_data(form_data))
+                with metrics.timer('render'):
+                    display_prediction(prediction, explanation)
+
+                # Only shown when similar_students.npz has been built next to the model
+                index = get_index(predictor.registry.path)
+                if index is not None:
+                    with metrics.timer('similar_students'):
+                        neighbours = index.neighbours(form_data, k=5)
+                    display_similar_students(neighbours)
+                
+                # Add timestamp
+                st.markdown(f"""
+                    <div style='text-align: center; margin-top: 2rem; color: #7f8c8d; font-size: 0.9rem;'>
+                        Analisis selesai pada {datetime.now().strftime('%d-%m-%Y %H:%M:%S')}
+                    </div>
+                """, unsafe_allow_html=True)
+        metrics.maybe_export()
+
+@st.fragment
+def whatif_section(predictor):
+    st.markdown('<div class="section-header">Analisis What-If</div>', unsafe_allow_html=True)
+    st.markdown(
+        '<div class="info-text">Isi data dasar siswa, lalu pilih satu atau dua input untuk divariasikan. '
+        'Seluruh kombinasi diprediksi sekaligus dalam satu pemanggilan model.</div>',
+        unsafe_allow_html=True
+    )
+
+    form_data = create_input_form()
+    if form_data is not None:
+        st.session_state.whatif_base = form_data
+    base = st.session_state.get('whatif_base')
+    if base is None:
+        return
+
+    fields = st.multiselect(
+        "Input yang Divariasikan",
+        options=list(SWEEP_FIELDS),
+        default=['Curricular_units_2nd_sem_approved'],
+        max_selections=2
+    )
+    if not fields:
+        return
+
+    axes = {}
+    for field in fields:
+        low, high, step = SWEEP_FIELDS[field]
+        value_range = st.slider(field, min_value=low, max_value=high, value=(low, high), step=step)
+        axes[field] = axis_values(field, *value_range)
+
+    grid = sweep(predictor, base, axes)
+    if len(fields) == 1:
+        st.line_chart(grid, x=fields[0], y='Probabilitas_Dropout')
+    else:
+        heatmap = alt.Chart(grid).mark_rect().encode(
+            x=alt.X(f'{fields[0]}:O'),
+            y=alt.Y(f'{fields[1]}:O', sort='descending'),
+            color=alt.Color('Probabilitas_Dropout:Q', scale=alt.Scale(scheme='redyellowgreen', reverse=True)),
+            tooltip=fields + ['Probabilitas_Dropout', 'Prediksi'],
+        )
+        st.altair_chart(heatmap, use_container_width=True)
+    st.caption(f"{len(grid):,} kombinasi diprediksi")
+
+@st.cache_resource
+def get_predictor():
+    # Shared by every session; per-session state stays in st.session_state
+    return StudentPredictor(
+        on_error=st.error,
+        cache=get_prediction_cache(maxsize=1024, ttl_seconds=3600),
+        metrics=get_metrics()
+    )
+
 def main():
     st.markdown("""
         <div style='text-align: center; margin-bottom: 2rem;'>
@@ -814,24 +605,25 @@ def main():
         </div>
     """, unsafe_allow_html=True)
 
-    predictor = StudentPredictor()
+    metrics = get_metrics()
+    predictor = get_predictor()
+    # Cheap when the model file is unchanged: one stat() call
     if predictor.load_model():
-        form_data = create_input_form()
-        
-        if form_data is not None:
-            with st.spinner("Menganalisis data siswa..."):
-                input_data = predictor.prepare_input_data(form_data)
-                prediction = predictor.predict(input_data)
-                
-                if prediction is not None:
-                    display_prediction(prediction)
-                    
-                    # Add timestamp
-                    st.markdown(f"""
-                        <div style='text-align: center; margin-top: 2rem; color: #7f8c8d; font-size: 0.9rem;'>
-                            Analisis selesai pada {datetime.now().strftime('%d-%m-%Y %H:%M:%S')}
-                        </div>
-                    """, unsafe_allow_html=True)
+        display_model_info(predictor.registry.stats(), predictor.cache.stats())
+
+        # A reload with ?job=... goes straight back to that job
+        mode = st.radio("Mode Prediksi", ["Satu Siswa", "Unggah CSV", "Analisis What-If"], horizontal=True,
+                        index=1 if 'job' in st.query_params else 0)
+        if mode == "Unggah CSV":
+            bulk_scoring_section(get_job_queue())
+        elif mode == "Analisis What-If":
+            whatif_section(predictor)
+        else:
+            single_prediction_section(predictor, metrics)
+
+    # Last, so the panel and the scrape file include this run's stages
+    display_metrics_panel(metrics, predictor.drift)
+    metrics.maybe_export()
 
 # Add this JavaScript to handle the popup
 st.markdown("""
@@ -0,0 +1,192 @@
+"""Score a CSV or Parquet file of students without starting Streamlit.
+
+    python batch_score.py data_agum.csv predictions.csv --workers 8
+
+The input is cut into shards that are scored in a process pool. Each
+finished shard is written to ``<output>.parts/`` right away, so an
+interrupted run picks up again from the last completed shard when the same
+command is repeated.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+from batch_scoring import result_frame, score_valid
+from dataset_store import iter_batches
+from model_registry import default_model_path
+from predictor import StudentPredictor
+
+# Result columns that are text even when every value in a shard is empty
+TEXT_COLUMNS = ('Prediksi', 'Risiko_Dropout', 'Faktor_Utama', 'Alasan_Ditolak')
+
+_predictor = None
+
+
+def _init_worker(model_path):
+    # Runs once per worker process, so the model is unpickled once per worker
+    global _predictor
+    _predictor = StudentPredictor(model_path or default_model_path(bulk=True))
+    if not _predictor.load_model():
+        raise RuntimeError(f"Could not load model from {_predictor.registry.path}")
+
+
+def _score_shard(index, frame, row_offset, part_path, explain_top=0):
+    start = time.perf_counter()
+    predictions, factors, reasons, _, _ = score_valid(_predictor, frame, explain_top)
+    results = result_frame(predictions, row_offset, factors, reasons)
+
+    # Write under a temporary name so a killed worker never leaves a half shard
+    tmp_path = part_path + '.tmp'
+    results.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, part_path)
+    return index, len(frame), time.perf_counter() - start
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise SystemExit("Parquet input/output needs pyarrow: pip install pyarrow")
+    return pyarrow, pyarrow.parquet
+
+
+def iter_shards(path, shard_size):
+    if os.path.isdir(path):
+        yield from iter_batches(path, shard_size)
+    elif path.endswith('.parquet'):
+        _, pq = _require_pyarrow()
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=shard_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=shard_size)
+
+
+def _check_manifest(parts_dir, manifest):
+    manifest_path = os.path.join(parts_dir, 'manifest.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = json.load(f)
+        if previous != manifest:
+            raise SystemExit(
+                f"{parts_dir} belongs to a different input, shard size or --explain setting; "
+                "remove it or pass --restart"
+            )
+    else:
+        os.makedirs(parts_dir, exist_ok=True)
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f)
+
+
+def _part_path(parts_dir, index):
+    return os.path.join(parts_dir, f'part-{index:06d}.csv')
+
+
+def _merge_parts(parts_dir, n_shards, output):
+    if output.endswith('.parquet'):
+        pa, pq = _require_pyarrow()
+        writer = None
+        for index in range(n_shards):
+            # Read as text, so an all-empty column in one part is not a float column there
+            part = pd.read_csv(_part_path(parts_dir, index), dtype={c: str for c in TEXT_COLUMNS},
+                               keep_default_na=False)
+            table = pa.Table.from_pandas(part, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(output, table.schema)
+            writer.write_table(table)
+        if writer is not None:
+            writer.close()
+    else:
+        with open(output, 'wb') as out:
+            for index in range(n_shards):
+                with open(_part_path(parts_dir, index), 'rb') as part:
+                    if index > 0:
+                        part.readline()  # header already written by the first shard
+                    shutil.copyfileobj(part, out)
+
+
+def run(input_path, output, model_path=None, shard_size=50000, workers=None, restart=False, explain_top=0):
+    workers = workers or os.cpu_count() or 1
+    parts_dir = output + '.parts'
+    if restart and os.path.isdir(parts_dir):
+        shutil.rmtree(parts_dir)
+
+    stat = os.stat(input_path)
+    _check_manifest(parts_dir, {
+        'input': os.path.abspath(input_path),
+        'input_size': stat.st_size,
+        'input_mtime_ns': stat.st_mtime_ns,
+        'shard_size': shard_size,
+        'explain_top': explain_top,
+    })
+
+    start = time.perf_counter()
+    rows_done = 0
+    rows_skipped = 0
+    n_shards = 0
+    pending = set()
+
+    def collect(done):
+        nonlocal rows_done
+        for future in done:
+            index, rows, seconds = future.result()
+            rows_done += rows
+            elapsed = time.perf_counter() - start
+            print(f"shard {index:>6} | {rows:>8,} rows in {seconds:6.2f}s | "
+                  f"{rows_done / elapsed:>10,.0f} rows/sec overall", flush=True)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model_path,)) as pool:
+        row_offset = 0
+        for index, frame in enumerate(iter_shards(input_path, shard_size)):
+            n_shards += 1
+            part_path = _part_path(parts_dir, index)
+            if os.path.exists(part_path):
+                rows_skipped += len(frame)  # finished in an earlier run
+            else:
+                # Keep only a couple of shards per worker in flight to bound memory
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                pending.add(pool.submit(_score_shard, index, frame, row_offset, part_path, explain_top))
+            row_offset += len(frame)
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+
+    _merge_parts(parts_dir, n_shards, output)
+    shutil.rmtree(parts_dir)
+
+    elapsed = time.perf_counter() - start
+    print(f"Scored {rows_done:,} rows ({rows_skipped:,} resumed from earlier run) "
+          f"in {elapsed:.2f}s with {workers} workers: {rows_done / max(elapsed, 1e-9):,.0f} rows/sec")
+    return rows_done + rows_skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score students in bulk with the dropout model")
+    parser.add_argument('input', help="CSV/Parquet file shaped like data_agum.csv, or a dataset store directory")
+    parser.add_argument('output', help="Where to write predictions (.csv or .parquet)")
+    parser.add_argument('--model', default=None,
+                        help="Model to load (default: model_artifact/, model_bundle.pkl or model.pkl, whichever exists first)")
+    parser.add_argument('--shard-size', type=int, default=50000, help="Rows per shard")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--restart', action='store_true', help="Ignore shards from an interrupted run")
+    parser.add_argument('--explain', type=int, default=0, metavar='N',
+                        help="Add a Faktor_Utama column with the N fields that drove each prediction")
+    args = parser.parse_args(argv)
+
+    run(args.input, args.output, model_path=args.model, shard_size=args.shard_size,
+        workers=args.workers, restart=args.restart, explain_top=args.explain)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from explanations import format_factors
+from outcomes import risk_labels
+
+
+def prepare_batch_frame(frame):
+    """Fill in the form fields that a data_agum.csv-shaped table does not carry."""
+    frame = frame.copy()
+
+    # The form's Status is 1 for active (enrolled/graduate) and 0 for dropout.
+    # Intake files have no outcome yet; a model that needs Status gets it
+    # reported as missing by the validation schema.
+    if 'Status' in frame.columns and not pd.api.types.is_numeric_dtype(frame['Status']):
+        frame['Status'] = (frame['Status'] != 'Dropout').astype(int)
+
+    for sem in ('1st', '2nd'):
+        ratio = f'Ratio_approved_{sem}_sem'
+        units = [f'Curricular_units_{sem}_sem_enrolled', f'Curricular_units_{sem}_sem_approved']
+        if ratio not in frame.columns and all(c in frame.columns for c in units):
+            enrolled = frame[f'Curricular_units_{sem}_sem_enrolled'].to_numpy(dtype=float)
+            approved = frame[f'Curricular_units_{sem}_sem_approved'].to_numpy(dtype=float)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                frame[ratio] = np.where(enrolled > 0, approved / enrolled, 0.0)
+    return frame
+
+
+def score_frame(predictor, frame):
+    """Encode a whole frame as one matrix and score it with a single predict call."""
+    frame = prepare_batch_frame(frame)
+    start = time.perf_counter()
+    input_data = predictor.prepare_batch_data(frame)
+    encoded = time.perf_counter()
+    predictions = predictor.predict_many(input_data)
+    finished = time.perf_counter()
+    timings = {
+        'encode_seconds': encoded - start,
+        'predict_seconds': finished - encoded,
+    }
+    return predictions, timings
+
+
+def score_valid(predictor, frame, explain_top=0):
+    """Validate ``frame`` against the predictor's schema and score only the rows that pass.
+
+    Historical tables are checked for categories, types and missing
+    values; the form's min/max bounds do not apply to them.
+
+    Returns ``(predictions, factors, reasons, report, timings)`` with one
+    entry per input row: rejected rows get an empty prediction and their
+    "field:reason" list, accepted rows an empty reason.
+    """
+    start = time.perf_counter()
+    report = predictor.schema.validate(prepare_batch_frame(frame), bounds=False)
+    validated = time.perf_counter()
+    valid = report.valid
+
+    predictions = np.full(len(frame), '', dtype=object)
+    factors = np.full(len(frame), '', dtype=object) if explain_top else None
+    timings = {'encode_seconds': 0.0, 'predict_seconds': 0.0}
+    if valid.any():
+        accepted = frame[valid]
+        predictions[valid], timings = score_frame(predictor, accepted)
+        if explain_top:
+            factors[valid] = explain_frame(predictor, accepted, explain_top)
+
+    reasons = np.full(len(frame), '', dtype=object)
+    reasons[~valid] = report.reasons()
+    timings['validate_seconds'] = validated - start
+    return predictions, factors, reasons, report, timings
+
+
+def explain_frame(predictor, frame, top=3):
+    """Top contributing fields per row, formatted for a CSV column."""
+    input_data = predictor.prepare_batch_data(prepare_batch_frame(frame))
+    # Empty cells when the model cannot be explained (not a random forest)
+    return [format_factors(e['factors']) if e else '' for e in predictor.explain_many(input_data, top)]
+
+
+def result_frame(predictions, row_offset=0, factors=None, reasons=None):
+    # 1-based row numbers so results can be matched back to the input file
+    results = pd.DataFrame({
+        'Baris': np.arange(row_offset, row_offset + len(predictions)) + 1,
+        'Prediksi': predictions,
+        'Risiko_Dropout': risk_labels(predictions),
+    })
+    if factors is not None:
+        results['Faktor_Utama'] = factors
+    if reasons is not None:
+        results['Alasan_Ditolak'] = reasons
+    return results
+
+
+def iter_scored_chunks(predictor, source, chunksize=10000, explain_top=0):
+    """Stream a CSV in chunks and yield (results, stats) per chunk.
+
+    Only one chunk is held in memory at a time, so files larger than RAM
+    can be scored as long as the caller writes results out as they come.
+    With ``explain_top`` each row also gets its most influential fields.
+    Rows that fail validation stay in the output, unscored, with the
+    reasons in ``Alasan_Ditolak``.
+    """
+    row_offset = 0
+    for chunk in pd.read_csv(source, chunksize=chunksize):
+        start = time.perf_counter()
+        predictions, factors, reasons, report, timings = score_valid(predictor, chunk, explain_top)
+        elapsed = time.perf_counter() - start
+
+        results = result_frame(predictions, row_offset, factors, reasons)
+        stats = dict(timings, rows=len(chunk), seconds=elapsed,
+                     rejected=report.n_rejected, rejected_by_field=report.counts(),
+                     row_latency_ms=elapsed * 1000 / max(len(chunk), 1))
+        row_offset += len(chunk)
+        yield results, stats
+
+
+def summarize_chunk_stats(chunk_stats):
+    rows = sum(s['rows'] for s in chunk_stats)
+    seconds = sum(s['seconds'] for s in chunk_stats)
+    latencies = np.array([s['row_latency_ms'] for s in chunk_stats]) if chunk_stats else np.zeros(1)
+    rejected_by_field = {}
+    for s in chunk_stats:
+        for field, reasons in s.get('rejected_by_field', {}).items():
+            merged = rejected_by_field.setdefault(field, {})
+            for reason, count in reasons.items():
+                merged[reason] = merged.get(reason, 0) + count
+    return {
+        'rows': rows,
+        'rejected': sum(s.get('rejected', 0) for s in chunk_stats),
+        'rejected_by_field': rejected_by_field,
+        'chunks': len(chunk_stats),
+        'seconds': seconds,
+        'rows_per_second': rows / seconds if seconds > 0 else 0.0,
+        'row_latency_ms_mean': seconds * 1000 / rows if rows else 0.0,
+        'row_latency_ms_p95': float(np.percentile(latencies, 95)),
+    }
@@ -0,0 +1,75 @@
+"""Compare the NumPy forest engine against sklearn's RandomForest.predict.
+
+    python benchmarks/forest_engine.py --model model.pkl --data data_agum.csv
+
+Checks that both backends give the same predictions on rows built from
+data_agum.csv, then times batches of 1 and 10k rows.
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_scoring import prepare_batch_frame  # noqa: E402
+from forest_engine import export_forest  # noqa: E402
+from predictor import StudentPredictor  # noqa: E402
+
+
+def time_call(fn, X, repeats):
+    fn(X)  # warm up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default='model.pkl')
+    parser.add_argument('--data', default='data_agum.csv')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 10000])
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    predictor = StudentPredictor(args.model, backend='sklearn')
+    if not predictor.load_model():
+        return 1
+    model = predictor.model
+    start = time.perf_counter()
+    engine = export_forest(model)
+    print(f"Exported {engine.n_trees} trees / {engine.n_nodes:,} nodes "
+          f"(max depth {engine.max_depth}) in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    X = predictor.prepare_batch_data(prepare_batch_frame(pd.read_csv(args.data)))
+    rng = np.random.default_rng(42)
+
+    def sklearn_predict(batch):
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore")
+            return model.predict(batch)
+
+    agree = np.array_equal(sklearn_predict(X), engine.predict(X))
+    print(f"Predictions agree on {len(X):,} rows from {args.data}: {agree}")
+
+    print(f"{'batch':>8} {'sklearn ms':>12} {'numpy ms':>10} {'speedup':>8}")
+    for n in args.batch_sizes:
+        batch = X[rng.integers(0, len(X), n)]
+        agree = agree and np.array_equal(sklearn_predict(batch), engine.predict(batch))
+        repeats = args.repeats if n < 1000 else max(args.repeats // 5, 3)
+        sk = time_call(sklearn_predict, batch, repeats)
+        fast = time_call(engine.predict, batch, repeats)
+        print(f"{n:>8} {sk * 1000:>12.3f} {fast * 1000:>10.3f} {sk / fast:>7.2f}x")
+
+    return 0 if agree else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""Time every stage of the prediction path and compare against a baseline.
+
+    python benchmarks/prediction_path.py --output bench.json
+    python benchmarks/prediction_path.py --baseline bench.json --output bench_new.json
+
+Stages: ``load_model`` (cold, with a fresh registry, and warm),
+``prepare_input_data`` and ``predict`` for one form, the end-to-end
+form dict -> label path the app runs, and batch scoring (encode + predict)
+for batch sizes from 1 to 100k rows sampled from data_agum.csv, along with
+input validation of the same batches. Each stage
+reports p50/p95/p99 latency, rows/sec and peak traced memory. With
+``--baseline``, stages whose p50 got slower by more than ``--threshold``
+are flagged and the exit code is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dataset_store  # noqa: E402
+from batch_scoring import prepare_batch_frame  # noqa: E402
+from model_registry import ModelRegistry  # noqa: E402
+from predictor import StudentPredictor  # noqa: E402
+
+DEFAULT_BATCH_SIZES = [1, 10, 100, 1000, 10000, 100000]
+
+
+def measure(fn, repeats, rows=1, setup=None):
+    """Latency percentiles over ``repeats`` calls, then peak memory of one more."""
+    fn(setup() if setup else None)  # warm up
+    timings = []
+    for _ in range(repeats):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        fn(arg)
+        timings.append(time.perf_counter() - start)
+
+    # Traced separately: tracemalloc slows allocation-heavy code down
+    arg = setup() if setup else None
+    tracemalloc.start()
+    fn(arg)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+    return {
+        'rows': rows,
+        'repeats': repeats,
+        'p50_ms': p50 * 1000,
+        'p95_ms': p95 * 1000,
+        'p99_ms': p99 * 1000,
+        'rows_per_sec': rows / p50 if p50 else None,
+        'peak_mb': peak / 1e6,
+    }
+
+
+def load_frame(path):
+    if os.path.isdir(path):
+        return dataset_store.load(path)
+    return pd.read_csv(path)
+
+
+def run(model_path=None, data_path='data_agum.csv', batch_sizes=DEFAULT_BATCH_SIZES, repeats=50, seed=42):
+    predictor = StudentPredictor(model_path)
+    if not predictor.load_model():
+        raise SystemExit(f"Could not load model from {predictor.registry.path}")
+    path = predictor.registry.path
+
+    frame = prepare_batch_frame(load_frame(data_path))
+    rng = np.random.default_rng(seed)
+    # The app's form only carries these fields; everything else is imputed
+    forms = frame[predictor.feature_names].to_dict('records')
+    results = {}
+
+    def cold_load(_):
+        fresh = StudentPredictor(path)
+        fresh.registry = ModelRegistry(path)
+        fresh.load_model()
+
+    results['load_model_cold'] = measure(cold_load, max(repeats // 10, 3))
+    results['load_model_warm'] = measure(lambda _: predictor.load_model(), repeats)
+
+    def pick_form():
+        return forms[rng.integers(len(forms))]
+
+    results['prepare_input_data'] = measure(predictor.prepare_input_data, repeats, setup=pick_form)
+    results['predict'] = measure(predictor.predict, repeats,
+                                 setup=lambda: predictor.prepare_input_data(pick_form()))
+    # What one submit in the app costs, without the prediction cache
+    results['form_to_label'] = measure(lambda form: predictor.predict(predictor.prepare_input_data(form)),
+                                       repeats, setup=pick_form)
+
+    for n in batch_sizes:
+        batch = frame.iloc[rng.integers(0, len(frame), n)].reset_index(drop=True)
+        batch_repeats = repeats if n <= 1000 else max(repeats // (n // 1000), 3)
+        results[f'batch_{n}'] = measure(
+            lambda b: predictor.predict_many(predictor.prepare_batch_data(b)),
+            batch_repeats, rows=n, setup=lambda: batch,
+        )
+        results[f'validate_{n}'] = measure(predictor.schema.validate, batch_repeats, rows=n,
+                                           setup=lambda: batch)
+
+    meta = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'model': path,
+        'model_version': predictor.registry.version,
+        'data': data_path,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+    return {'meta': meta, 'results': results}
+
+
+def compare(current, baseline, threshold):
+    """Stages whose p50 grew by more than ``threshold`` (a fraction)."""
+    regressions = []
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None or not before['p50_ms']:
+            continue
+        ratio = result['p50_ms'] / before['p50_ms']
+        if ratio > 1 + threshold:
+            regressions.append((name, before['p50_ms'], result['p50_ms'], ratio))
+    return regressions
+
+
+def print_report(report, baseline=None):
+    print(f"{'stage':<20} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'rows/sec':>12} {'peak MB':>9}"
+          + (f" {'vs base':>8}" if baseline else ''))
+    for name, r in report['results'].items():
+        line = (f"{name:<20} {r['p50_ms']:>10.3f} {r['p95_ms']:>10.3f} {r['p99_ms']:>10.3f} "
+                f"{r['rows_per_sec'] or 0:>12,.0f} {r['peak_mb']:>9.2f}")
+        before = baseline and baseline['results'].get(name)
+        if before:
+            line += f" {r['p50_ms'] / before['p50_ms']:>7.2f}x"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default=None,
+                        help="Model to load (default: same lookup as the app)")
+    parser.add_argument('--data', default='data_agum.csv', help="CSV or dataset store to sample rows from")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=DEFAULT_BATCH_SIZES)
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--output', help="Write the results as JSON here")
+    parser.add_argument('--baseline', help="Earlier JSON results to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="Flag stages whose p50 is this much slower than the baseline (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    report = run(args.model, args.data, args.batch_sizes, args.repeats)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if baseline:
+        regressions = compare(report, baseline, args.threshold)
+        for name, before, after, ratio in regressions:
+            print(f"REGRESSION {name}: p50 {before:.3f} ms -> {after:.3f} ms ({ratio:.2f}x)")
+        if regressions:
+            return 1
+        print(f"No stage slower than the baseline by more than {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
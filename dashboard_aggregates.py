@@ -0,0 +1,204 @@
+"""Summary tables behind the Metabase cards, kept up to date incrementally.
+
+    python dashboard_aggregates.py --url sqlite:///dashboard.db --table data_agum
+
+The dashboard bins ``Dropout_Risk_Score`` and breaks ``Status`` down by risk
+and by engagement. Instead of scanning every student per card, it can read:
+
+* ``agg_risk_histogram``: students per risk-score bin and status
+* ``agg_risk_status_share``: view adding each status' share of its bin
+* ``agg_engagement_segments``: students per Course, Application_mode,
+  engagement segment and status
+
+All three hold counts only, so a change is applied as +1 for the new version
+of a row and -1 for the old one. ``db_export.py`` does this for every chunk
+it upserts; running this script rebuilds them from the full table.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import (BigInteger, Column, Float, Integer, MetaData, Table, Text, bindparam,
+                        create_engine, inspect, select, text)
+
+from dataset_store import KEY, ROW_HASH
+
+RISK_BIN_WIDTH = 0.5
+ENGAGEMENT_EDGES = [0.5, 1.0, 1.5, 2.0]
+ENGAGEMENT_LABELS = ['< 0.5', '0.5 - 1', '1 - 1.5', '1.5 - 2', '>= 2']
+SOURCE_COLUMNS = ['Dropout_Risk_Score', 'Engagement_Score', 'Course', 'Application_mode', 'Status']
+
+AGGREGATES = {
+    'agg_risk_histogram': [('risk_bin', Float), ('Status', Text)],
+    'agg_engagement_segments': [('Course', Integer), ('Application_mode', Integer),
+                                ('engagement_segment', Text), ('Status', Text)],
+}
+SHARE_VIEW = 'agg_risk_status_share'
+# SQLite caps the number of bound parameters per statement
+KEY_BATCH = 500
+
+
+def bin_frame(frame):
+    """The grouping columns of every aggregate, one row per student."""
+    risk = frame['Dropout_Risk_Score'].to_numpy(np.float64)
+    # Engagement is evaluations / (enrolled + 1e-5), so 0.999999 means 1
+    engagement = np.round(frame['Engagement_Score'].to_numpy(np.float64), 3)
+    return pd.DataFrame({
+        'risk_bin': np.round(np.floor(risk / RISK_BIN_WIDTH) * RISK_BIN_WIDTH, 2),
+        'Status': frame['Status'].astype(str).to_numpy(),
+        'Course': frame['Course'].to_numpy(np.int64),
+        'Application_mode': frame['Application_mode'].to_numpy(np.int64),
+        'engagement_segment': np.asarray(ENGAGEMENT_LABELS, dtype=object)[
+            np.digitize(engagement, ENGAGEMENT_EDGES)],
+    })
+
+
+def count_rows(frame, sign=1):
+    binned = bin_frame(frame)
+    counts = {}
+    for name, columns in AGGREGATES.items():
+        keys = [c for c, _ in columns]
+        grouped = binned.groupby(keys, sort=False).size().rename('n').reset_index()
+        grouped['n'] *= sign
+        counts[name] = grouped
+    return counts
+
+
+def merge_counts(*all_counts):
+    merged = {}
+    for name, columns in AGGREGATES.items():
+        keys = [c for c, _ in columns]
+        parts = [counts[name] for counts in all_counts if len(counts[name])]
+        if not parts:
+            merged[name] = pd.DataFrame(columns=keys + ['n'])
+            continue
+        total = pd.concat(parts).groupby(keys, sort=False)['n'].sum().reset_index()
+        merged[name] = total[total['n'] != 0]
+    return merged
+
+
+def _aggregate_tables(metadata):
+    return {
+        name: Table(name, metadata,
+                    *[Column(c, type_, primary_key=True) for c, type_ in columns],
+                    Column('n', BigInteger, nullable=False))
+        for name, columns in AGGREGATES.items()
+    }
+
+
+def ensure_aggregates(engine, source_table):
+    """Create the summary tables, filling them from ``source_table`` if new."""
+    existing = inspect(engine)
+    missing = [name for name in AGGREGATES if not existing.has_table(name)]
+    tables = _aggregate_tables(MetaData())
+    if missing:
+        rebuild(engine, source_table)
+    return tables
+
+
+def rebuild(engine, source_table, chunk_size=50000):
+    metadata = MetaData()
+    tables = _aggregate_tables(metadata)
+    with engine.begin() as connection:
+        connection.execute(text(f'DROP VIEW IF EXISTS {SHARE_VIEW}'))
+        for table in tables.values():
+            table.drop(connection, checkfirst=True)
+        metadata.create_all(connection)
+        connection.execute(text(
+            f'CREATE VIEW {SHARE_VIEW} AS SELECT risk_bin, "Status", n, '
+            f'n * 1.0 / SUM(n) OVER (PARTITION BY risk_bin) AS share FROM agg_risk_histogram'
+        ))
+
+        total = 0
+        if inspect(connection).has_table(source_table):
+            quoted = ', '.join(f'"{c}"' for c in SOURCE_COLUMNS)
+            # Only the five grouping inputs are read, chunk by chunk
+            counts = []
+            for chunk in pd.read_sql(f'SELECT {quoted} FROM "{source_table}"', connection,
+                                     chunksize=chunk_size):
+                counts.append(count_rows(chunk))
+                total += len(chunk)
+            if counts:
+                apply_counts(connection, tables, merge_counts(*counts))
+    return total
+
+
+def _insert(connection):
+    if connection.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif connection.dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise SystemExit(f"Upsert is not implemented for {connection.dialect.name}")
+    return insert
+
+
+def apply_counts(connection, tables, counts):
+    """Add signed counts to the summary tables; groups that reach 0 are removed."""
+    insert = _insert(connection)
+    for name, frame in counts.items():
+        if not len(frame):
+            continue
+        table = tables[name]
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[c for c, _ in AGGREGATES[name]],
+            set_={'n': table.c.n + statement.excluded.n},
+        )
+        rows = [
+            {c: (v.item() if isinstance(v, np.generic) else v) for c, v in row.items()}
+            for row in frame.to_dict('records')
+        ]
+        connection.execute(statement, rows)
+        if (frame['n'] < 0).any():
+            connection.execute(table.delete().where(table.c.n <= 0))
+
+
+def fetch_previous(connection, table, keys):
+    """Stored versions of the given (signed) keys, with their row hashes."""
+    columns = [table.c[KEY], table.c[ROW_HASH]] + [table.c[c] for c in SOURCE_COLUMNS]
+    statement = select(*columns).where(table.c[KEY].in_(bindparam('keys', expanding=True)))
+    frames = []
+    for start in range(0, len(keys), KEY_BATCH):
+        batch = [int(k) for k in keys[start:start + KEY_BATCH]]
+        result = connection.execute(statement, {'keys': batch})
+        frames.append(pd.DataFrame(result.fetchall(), columns=[c.name for c in columns]))
+    if not frames:
+        return pd.DataFrame(columns=[c.name for c in columns])
+    return pd.concat(frames, ignore_index=True)
+
+
+def chunk_delta(chunk, previous):
+    """Counts to add for an upserted chunk: +new versions, -replaced versions.
+
+    ``chunk`` and ``previous`` carry signed ``_key``/``_row_hash`` values, as
+    stored in the database. Unchanged rows contribute nothing.
+    """
+    stored = pd.Series(previous[ROW_HASH].to_numpy(), index=previous[KEY].to_numpy())
+    old_hash = stored.reindex(chunk[KEY].to_numpy()).to_numpy()
+    changed = pd.isna(old_hash) | (old_hash != chunk[ROW_HASH].to_numpy())
+    replaced = previous[previous[KEY].isin(chunk[KEY].to_numpy()[changed])]
+    return merge_counts(count_rows(chunk[changed]), count_rows(replaced, sign=-1))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the dashboard summary tables")
+    parser.add_argument('--url', default=os.environ.get('DATABASE_URL'),
+                        help="SQLAlchemy database URL (default: $DATABASE_URL)")
+    parser.add_argument('--table', default='data_agum', help="Student table to summarize")
+    args = parser.parse_args(argv)
+    if not args.url:
+        parser.error("no database URL: pass --url or set DATABASE_URL")
+
+    start = time.perf_counter()
+    engine = create_engine(args.url)
+    rows = rebuild(engine, args.table)
+    print(f"Summarized {rows:,} students from {args.table} in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
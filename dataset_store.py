@@ -0,0 +1,274 @@
+"""Columnar student dataset store, replacing repeated parses of data_agum.csv.
+
+    python dataset_store.py data_agum.csv data_store
+    python dataset_store.py new_students.csv data_store --append
+
+The store is a directory of Parquet files holding the raw columns plus the
+engineered ones. Integer columns are downcast to the smallest type that
+holds them (``Gender`` and ``Displaced`` become int8, ``Course`` int16),
+floats to float32 only where that is lossless, and text columns such as
+``Status`` are dictionary-encoded categoricals. Readers load just the
+columns they name, and ``filters`` skip whole row groups using the min/max
+statistics Parquet keeps for each of them.
+
+Every row also carries a ``_key`` and a ``_row_hash`` of its raw values.
+``refresh`` uses them to find new and changed students in an export, so
+engineered features are only computed, and only the affected part files
+rewritten, for that delta:
+
+    python dataset_store.py semester.csv data_store --refresh
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from features import ENGINEERED_FEATURES, add_engineered_features
+
+DEFAULT_STORE = 'data_store'
+ROW_GROUP_SIZE = 64_000
+# Refresh rewrites whole part files, so bound how much one changed row costs
+PART_ROWS = 256_000
+KEY = '_key'
+ROW_HASH = '_row_hash'
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError:
+        raise SystemExit("The dataset store needs pyarrow: pip install pyarrow")
+    return pyarrow, pyarrow.parquet
+
+
+def compact_dtypes(frame):
+    """Smallest dtypes that keep every value exactly.
+
+    ``_key`` and ``_row_hash`` stay uint64: later appends and refreshes
+    bring larger keys, which a narrowed stored type could not hold.
+    """
+    frame = frame.copy()
+    for column in frame.columns:
+        values = frame[column]
+        if column in (KEY, ROW_HASH) or pd.api.types.is_bool_dtype(values):
+            continue
+        if pd.api.types.is_integer_dtype(values):
+            frame[column] = pd.to_numeric(values, downcast='integer')
+        elif pd.api.types.is_float_dtype(values):
+            narrow = values.astype(np.float32)
+            # Grades like 127.3 have no exact float32 form and stay float64
+            if np.array_equal(narrow.to_numpy(np.float64), values.to_numpy(), equal_nan=True):
+                frame[column] = narrow
+        elif pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+            frame[column] = values.astype('category')
+    return frame
+
+
+def _part_files(directory):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.startswith('part-') and name.endswith('.parquet'))
+
+
+def _part_name(directory):
+    # Parts can be deleted by refresh, so number after the highest one left
+    numbers = [int(os.path.basename(path)[5:-8]) for path in _part_files(directory)]
+    return os.path.join(directory, f'part-{max(numbers, default=-1) + 1:05d}.parquet')
+
+
+def row_keys(frame, key=None):
+    """uint64 key per row: a hash of the ``key`` columns, else the row position."""
+    if not key:
+        return pd.Series(np.arange(len(frame), dtype=np.uint64), index=frame.index)
+    return pd.util.hash_pandas_object(frame[list(key)], index=False)
+
+
+def row_hashes(frame):
+    # Raw columns only, in a fixed order and dtype, so int8 vs int64 or
+    # category vs object storage does not change the hash
+    raw = sorted(c for c in frame.columns if c not in ENGINEERED_FEATURES and not c.startswith('_'))
+    canonical = pd.DataFrame({
+        c: frame[c].to_numpy(np.float64) if pd.api.types.is_numeric_dtype(frame[c])
+        else frame[c].astype(str).to_numpy()
+        for c in raw
+    })
+    return pd.util.hash_pandas_object(canonical, index=False).to_numpy()
+
+
+def _write_part(table, directory, row_group_size):
+    _, pq = _require_pyarrow()
+    path = _part_name(directory)
+    tmp_path = path + '.tmp'
+    pq.write_table(table, tmp_path, row_group_size=row_group_size, compression='zstd')
+    os.replace(tmp_path, path)
+    return path
+
+
+def _prepare(frame, keys, sort_by=None):
+    if not all(column in frame.columns for column in ENGINEERED_FEATURES):
+        frame = add_engineered_features(frame)
+    frame = frame.assign(**{KEY: np.asarray(keys, dtype=np.uint64), ROW_HASH: row_hashes(frame)})
+    if sort_by:
+        # Sorted row groups have tight min/max ranges, so filters skip more of them
+        frame = frame.sort_values(sort_by, kind='stable')
+    return frame.reset_index(drop=True)
+
+
+def write_store(frame, directory, key=None, sort_by=None, row_group_size=ROW_GROUP_SIZE):
+    """Replace ``directory`` with a store built from ``frame``."""
+    pa, _ = _require_pyarrow()
+    os.makedirs(directory, exist_ok=True)
+    for path in _part_files(directory):
+        os.remove(path)
+    frame = compact_dtypes(_prepare(frame, row_keys(frame, key), sort_by))
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    for start in range(0, max(table.num_rows, 1), PART_ROWS):
+        path = _write_part(table.slice(start, PART_ROWS), directory, row_group_size)
+    return path
+
+
+def _append(frame, directory, row_group_size):
+    pa, _ = _require_pyarrow()
+    schema = pa.dataset.dataset(directory, format='parquet').schema
+    frame = frame.copy()
+    for field in schema:
+        if pa.types.is_dictionary(field.type):
+            frame[field.name] = frame[field.name].astype(str)
+    try:
+        # Safe cast: a value that no longer fits the stored type raises here
+        table = pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, KeyError) as e:
+        raise ValueError(f"New rows do not fit the store's schema ({e}); rebuild the store") from e
+    return _write_part(table, directory, row_group_size)
+
+
+def append_rows(frame, directory, key=None, sort_by=None, row_group_size=ROW_GROUP_SIZE):
+    """Add new students as another part file, in the store's existing schema."""
+    if key:
+        keys = row_keys(frame, key)
+    else:
+        # Positional keys continue after the rows already stored
+        stored = load(directory, columns=[KEY])[KEY]
+        start = int(stored.max()) + 1 if len(stored) else 0
+        keys = np.arange(start, start + len(frame), dtype=np.uint64)
+    return _append(_prepare(frame, keys, sort_by), directory, row_group_size)
+
+
+def refresh(frame, directory, key=None, row_group_size=ROW_GROUP_SIZE):
+    """Merge an export into the store, touching only new and changed rows.
+
+    Rows are matched on ``key`` columns, or on their position in the export
+    when no key is given (so the export must then be the full table, in the
+    same order). Unchanged rows are skipped, new rows are appended, and the
+    old versions of changed rows are dropped from the parts that held them.
+    Returns a dict with the number of new, changed and unchanged rows.
+    """
+    keys = row_keys(frame, key).to_numpy()
+    hashes = row_hashes(frame)
+    # Duplicate keys in one export: the last row wins
+    last = ~pd.Series(keys).duplicated(keep='last').to_numpy()
+    keys, hashes, frame = keys[last], hashes[last], frame[last]
+
+    stored = load(directory, columns=[KEY, ROW_HASH])
+    stored_hash = pd.Series(stored[ROW_HASH].to_numpy(), index=stored[KEY].to_numpy())
+    known = np.isin(keys, stored_hash.index.to_numpy())
+    previous = stored_hash.reindex(keys).to_numpy()
+    changed = known & (previous != hashes)
+    delta = ~known | changed
+
+    if changed.any():
+        _drop_keys(directory, keys[changed], row_group_size)
+    if delta.any():
+        # Engineered features are computed for the delta rows only
+        delta_frame = frame[delta].drop(columns=[c for c in ENGINEERED_FEATURES if c in frame.columns])
+        _append(_prepare(delta_frame, keys[delta]), directory, row_group_size)
+    return {'new': int((~known).sum()), 'changed': int(changed.sum()),
+            'unchanged': int((known & ~changed).sum())}
+
+
+def _drop_keys(directory, keys, row_group_size):
+    pa, pq = _require_pyarrow()
+    for path in _part_files(directory):
+        in_part = pq.read_table(path, columns=[KEY])[KEY].to_numpy()
+        stale = np.isin(in_part, keys)
+        if not stale.any():
+            continue
+        if stale.all():
+            os.remove(path)
+            continue
+        table = pq.read_table(path).filter(pa.array(~stale))
+        tmp_path = path + '.tmp'
+        pq.write_table(table, tmp_path, row_group_size=row_group_size, compression='zstd')
+        os.replace(tmp_path, path)
+
+
+def store_columns(directory, bookkeeping=False):
+    pa, _ = _require_pyarrow()
+    return [name for name in pa.dataset.dataset(directory, format='parquet').schema.names
+            if bookkeeping or not name.startswith('_')]
+
+
+def load(directory=DEFAULT_STORE, columns=None, filters=None):
+    """Read the store as a DataFrame.
+
+    ``columns`` limits what is read from disk; ``filters`` uses pyarrow's
+    form, e.g. ``[('Status', '==', 'Dropout'), ('Age_at_enrollment', '>', 25)]``.
+    The ``_key``/``_row_hash`` bookkeeping columns are left out unless named.
+    """
+    _, pq = _require_pyarrow()
+    table = pq.read_table(directory, columns=columns or store_columns(directory), filters=filters)
+    return table.to_pandas()
+
+
+def iter_batches(directory, batch_size, columns=None, filters=None):
+    pa, pq = _require_pyarrow()
+    dataset = pa.dataset.dataset(directory, format='parquet')
+    expression = pq.filters_to_expression(filters) if filters else None
+    columns = columns or store_columns(directory)
+    for batch in dataset.to_batches(columns=columns, filter=expression, batch_size=batch_size):
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or extend the columnar dataset store")
+    parser.add_argument('source', help="CSV or Parquet file shaped like data_agum.csv")
+    parser.add_argument('store', nargs='?', default=DEFAULT_STORE, help="Store directory")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--append', action='store_true', help="Add rows instead of rebuilding")
+    mode.add_argument('--refresh', action='store_true',
+                      help="Merge new and changed rows only, matched on --key")
+    parser.add_argument('--key', nargs='*', default=None,
+                        help="Columns identifying a student (default: row position)")
+    parser.add_argument('--sort-by', nargs='*', default=None,
+                        help="Columns to sort by, so filters on them skip more row groups")
+    parser.add_argument('--row-group-size', type=int, default=ROW_GROUP_SIZE)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.source.endswith('.parquet'):
+        frame = pd.read_parquet(args.source)
+    else:
+        frame = pd.read_csv(args.source)
+    if args.refresh:
+        counts = refresh(frame, args.store, key=args.key, row_group_size=args.row_group_size)
+        print(f"Refreshed {args.store}: {counts['new']:,} new, {counts['changed']:,} changed, "
+              f"{counts['unchanged']:,} unchanged in {time.perf_counter() - start:.2f}s")
+        return 0
+    write = append_rows if args.append else write_store
+    path = write(frame, args.store, key=args.key, sort_by=args.sort_by, row_group_size=args.row_group_size)
+
+    stored = load(args.store)
+    print(f"Wrote {path}: store has {len(stored):,} rows, "
+          f"{stored.memory_usage(deep=True).sum() / 1e6:.1f} MB in memory "
+          f"(source {frame.memory_usage(deep=True).sum() / 1e6:.1f} MB) "
+          f"in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
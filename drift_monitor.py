@@ -0,0 +1,263 @@
+"""Compare the students being scored with the students the model was trained on.
+
+    python drift_monitor.py --data data_agum.csv
+    python drift_monitor.py --check new_students.csv
+
+The reference is built once from the training data and written as
+drift_reference.json next to the model (train.py does the same after
+fitting): per monitored field, decile bin edges, the share of training rows
+in each bin, and the mean and standard deviation. Every batch that goes
+through ``StudentPredictor.predict_many`` is then folded into running
+Welford mean/variance and fixed-bin counts, so memory and the cost of an
+update depend only on the number of fields and bins, never on how many
+predictions have been served. PSI and a binned KS distance are computed
+from those counts on demand.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+import dataset_store
+from batch_scoring import prepare_batch_frame
+from model_registry import default_model_path
+
+DEFAULT_REFERENCE = 'drift_reference.json'
+DEFAULT_BINS = 10
+# Usual PSI reading: below 0.1 stable, 0.1-0.25 worth a look, above 0.25 shifted
+PSI_WARN = 0.1
+PSI_ALERT = 0.25
+# Keeps empty bins from sending PSI to infinity
+EPSILON = 1e-4
+CHECK_BATCH_ROWS = 50000
+
+
+def build_reference(encoder, frame, fields, bins=DEFAULT_BINS):
+    """Reference histograms for the numeric ``fields`` the encoder carries.
+
+    Edges and statistics are kept in the encoder's output units, which is
+    what ``predict_many`` sees; ``raw_scale``/``raw_offset`` map them back
+    to the form's units for reporting.
+    """
+    matrix = encoder.encode_frame(prepare_batch_frame(frame))
+    numeric = dict(zip(encoder.numeric_fields, _numeric_positions(encoder)))
+    reference = {'n_features': encoder.n_features, 'n_rows': len(frame), 'fields': {}}
+    for field in fields:
+        if field not in numeric:
+            continue
+        position = int(numeric[field])
+        values = matrix[:, position].astype(np.float64)
+        # Interior quantile edges; the first and last bins are open-ended
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+        scale, offset = _raw_affine(encoder, field)
+        reference['fields'][field] = {
+            'position': position,
+            'edges': edges.tolist(),
+            'shares': (counts / counts.sum()).tolist(),
+            'mean': float(values.mean()),
+            'std': float(values.std()),
+            'raw_scale': scale,
+            'raw_offset': offset,
+        }
+    return reference
+
+
+def _numeric_positions(encoder):
+    # FusedTransform records where each numeric field lands; the legacy layout puts them first
+    positions = getattr(encoder, 'numeric_positions', None)
+    return positions if positions is not None else np.arange(len(encoder.numeric_fields))
+
+
+def _raw_affine(encoder, field):
+    # FusedTransform standardizes numeric fields as x * scale + offset; undo that for display
+    if not hasattr(encoder, 'scale'):
+        return 1.0, 0.0
+    i = encoder.numeric_fields.index(field)
+    return float(1.0 / encoder.scale[i]), float(-encoder.offset[i] / encoder.scale[i])
+
+
+class DriftMonitor:
+    """Streaming per-field statistics against a fixed reference."""
+
+    def __init__(self, reference):
+        self.reference = reference
+        self.fields = list(reference['fields'])
+        self.positions = np.asarray([reference['fields'][f]['position'] for f in self.fields], dtype=np.int64)
+        self.edges = [np.asarray(reference['fields'][f]['edges']) for f in self.fields]
+        # Every field's edges padded into one matrix and every field's bins laid
+        # end to end, so a batch is binned with one comparison and one bincount
+        width = max((len(e) for e in self.edges), default=0)
+        self._edge_matrix = np.full((len(self.fields), width), np.inf)
+        for i, edges in enumerate(self.edges):
+            self._edge_matrix[i, :len(edges)] = edges
+        sizes = [len(e) + 1 for e in self.edges]
+        self._bin_offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+        self._n_bins = int(sum(sizes))
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+            self.mean = np.zeros(len(self.fields))
+            self.m2 = np.zeros(len(self.fields))
+            self._counts = np.zeros(self._n_bins, dtype=np.int64)
+
+    def update(self, input_data):
+        """Fold a batch of encoded rows into the running statistics."""
+        if input_data.shape[1] != self.reference['n_features']:
+            return
+        values = np.asarray(input_data[:, self.positions], dtype=np.float64)
+        n = values.shape[0]
+        if n == 0:
+            return
+        batch_mean = values.mean(axis=0)
+        batch_m2 = ((values - batch_mean) ** 2).sum(axis=0)
+        # Bin = number of edges <= value, as searchsorted(side='right') would give
+        bins = (self._edge_matrix <= values[:, :, None]).sum(axis=2) + self._bin_offsets
+        batch_counts = np.bincount(bins.ravel(), minlength=self._n_bins)
+        with self._lock:
+            # Chan et al.'s pairwise form of Welford's update, one batch at a time
+            total = self.count + n
+            delta = batch_mean - self.mean
+            self.mean = self.mean + delta * (n / total)
+            self.m2 = self.m2 + batch_m2 + delta ** 2 * (self.count * n / total)
+            self.count = total
+            self._counts += batch_counts
+
+    def report(self):
+        """PSI, binned KS distance and mean/std shift per field, in form units."""
+        with self._lock:
+            count = self.count
+            mean = self.mean.copy()
+            std = np.sqrt(self.m2 / count) if count else np.zeros(len(self.fields))
+            counts = np.split(self._counts.copy(), self._bin_offsets[1:])
+
+        fields = {}
+        for i, field in enumerate(self.fields):
+            ref = self.reference['fields'][field]
+            scale, offset = ref['raw_scale'], ref['raw_offset']
+            entry = {
+                'reference_mean': ref['mean'] * scale + offset,
+                'reference_std': ref['std'] * abs(scale),
+                'mean': None, 'std': None, 'psi': None, 'ks': None, 'status': 'no data',
+            }
+            if count:
+                expected = np.asarray(ref['shares'])
+                actual = counts[i] / count
+                psi = population_stability_index(expected, actual)
+                entry.update({
+                    'mean': float(mean[i] * scale + offset),
+                    'std': float(std[i] * abs(scale)),
+                    'psi': psi,
+                    'ks': float(np.abs(np.cumsum(expected) - np.cumsum(actual)).max()),
+                    'status': 'alert' if psi > PSI_ALERT else 'warn' if psi > PSI_WARN else 'ok',
+                })
+            fields[field] = entry
+        return {'count': count, 'fields': fields}
+
+
+def population_stability_index(expected, actual):
+    expected = np.clip(expected, EPSILON, None)
+    actual = np.clip(actual, EPSILON, None)
+    return float(((actual - expected) * np.log(actual / expected)).sum())
+
+
+def reference_path(model_path=None):
+    # The reference lives next to the model it was built for
+    model_path = os.path.abspath(model_path or default_model_path())
+    return os.path.join(os.path.dirname(model_path), DEFAULT_REFERENCE)
+
+
+def save_reference(reference, path):
+    # Written aside and renamed, so a running app never reads half a file
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(reference, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_reference(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+_monitors = {}
+_monitors_lock = threading.Lock()
+
+
+def get_drift_monitor(model_path=None):
+    # One monitor per reference file, shared by every session in this process,
+    # and replaced (counts start over) when the file is rebuilt, e.g. after
+    # retraining. None until a reference has been built for this model.
+    path = reference_path(model_path)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    stat_key = (stat.st_mtime_ns, stat.st_size)
+    with _monitors_lock:
+        entry = _monitors.get(path)
+        if entry is None or entry[0] != stat_key:
+            entry = (stat_key, DriftMonitor(load_reference(path)))
+            _monitors[path] = entry
+        return entry[1]
+
+
+def build_for_model(frame, model_path=None, bins=DEFAULT_BINS):
+    """Reference for ``frame`` encoded with the preprocessor of the model at ``model_path``."""
+    # predictor.py imports this module for the predict hook
+    from predictor import StudentPredictor
+
+    predictor = StudentPredictor(model_path)
+    if not predictor.load_model():
+        raise RuntimeError(f"Could not load model from {predictor.registry.path}")
+    return build_reference(predictor.encoder, frame, predictor.feature_names, bins)
+
+
+def load_frame(path):
+    if os.path.isdir(path):
+        return dataset_store.load(path)
+    return pd.read_csv(path)
+
+
+def main(argv=None):
+    from predictor import StudentPredictor
+
+    parser = argparse.ArgumentParser(description="Build the drift reference or check a file against it")
+    parser.add_argument('--data', default='data_agum.csv', help="Training CSV or dataset store for the reference")
+    parser.add_argument('--model', default=None, help="Model whose preprocessor encodes the rows")
+    parser.add_argument('--bins', type=int, default=DEFAULT_BINS)
+    parser.add_argument('--check', help="Score this CSV or dataset store against the reference instead")
+    args = parser.parse_args(argv)
+
+    path = reference_path(args.model)
+    if not args.check:
+        reference = build_for_model(load_frame(args.data), args.model, args.bins)
+        save_reference(reference, path)
+        print(f"Reference for {len(reference['fields'])} fields from {reference['n_rows']:,} rows -> {path}")
+        return 0
+
+    predictor = StudentPredictor(args.model)
+    if not predictor.load_model():
+        raise SystemExit(f"Could not load model from {predictor.registry.path}")
+    # A fresh monitor, so only the checked file is counted
+    monitor = DriftMonitor(load_reference(path))
+    batches = (dataset_store.iter_batches(args.check, CHECK_BATCH_ROWS) if os.path.isdir(args.check)
+               else pd.read_csv(args.check, chunksize=CHECK_BATCH_ROWS))
+    for batch in batches:
+        monitor.update(predictor.prepare_batch_data(prepare_batch_frame(batch)))
+    report = monitor.report()
+    print(f"{'field':<40} {'ref mean':>10} {'mean':>10} {'PSI':>8} {'KS':>6}  status")
+    for field, r in report['fields'].items():
+        print(f"{field:<40} {r['reference_mean']:>10.2f} {r['mean']:>10.2f} {r['psi']:>8.3f} {r['ks']:>6.3f}  {r['status']}")
+    return 1 if any(r['status'] == 'alert' for r in report['fields'].values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""Cross-validated comparison of the candidate models.
+
+    python evaluate.py --data data_store --folds 5 --output evaluation_report.json
+    python evaluate.py --plot confusion_matrices.png
+
+Replaces the notebook's ``evaluate_model``, which scored one train/test
+split and drew each confusion matrix inline. The processed matrix comes
+from the matrix cache (matrix_cache.py), and the stratified fold
+assignment for a fold count and seed is stored in the same cache entry, so
+a rerun on the same data goes straight to fitting. Every (model, fold)
+pair is then fitted in its own process; workers map the cached matrix
+once each. The report holds accuracy, per-class precision/recall/F1, the
+confusion matrix and fit/predict times per fold, plus their mean and
+standard deviation per model. Plotting is separate and only happens with
+``--plot``.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import sklearn
+from sklearn.metrics import accuracy_score, confusion_matrix, precision_recall_fscore_support
+from sklearn.model_selection import StratifiedKFold
+
+import matrix_cache
+from train import candidate_models, default_data_path, load_dataset
+
+DEFAULT_FOLDS = 5
+
+
+def folds_file(n_folds, seed):
+    return f'folds-{n_folds}-{seed}.npy'
+
+
+def materialize_folds(raw, cache_dir=matrix_cache.DEFAULT_CACHE_DIR, n_folds=DEFAULT_FOLDS, seed=42):
+    """The cached processed matrix for ``raw`` plus a stratified fold assignment.
+
+    The assignment (the test fold of every row) is stored next to the
+    matrix in its cache entry. Returns ``(entry path, cache hit)``.
+    """
+    matrix = matrix_cache.load_or_build(raw, cache_dir)
+    path = matrix_cache.entry_path(matrix.key, cache_dir)
+    fold_path = os.path.join(path, folds_file(n_folds, seed))
+    if os.path.exists(fold_path):
+        return path, matrix.hit
+
+    fold = np.empty(len(matrix.y), dtype=np.int8)
+    splitter = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+    for i, (_, test) in enumerate(splitter.split(np.zeros(len(matrix.y)), matrix.y)):
+        fold[test] = i
+    tmp_path = f'{fold_path}.{os.getpid()}.tmp.npy'
+    np.save(tmp_path, fold)
+    os.replace(tmp_path, fold_path)
+    return path, False
+
+
+_cached = {}
+
+
+def _load(path, n_folds, seed):
+    # Once per worker process, however many (model, fold) tasks it runs; the
+    # memory-mapped matrix pages are shared by every worker
+    if path not in _cached:
+        X, y, _, _, _ = matrix_cache.load(path)
+        _cached[path] = (X, y)
+    X, y = _cached[path]
+    return X, y, np.load(os.path.join(path, folds_file(n_folds, seed)))
+
+
+def _evaluate_fold(path, name, fold, n_folds, seed):
+    X, y, folds = _load(path, n_folds, seed)
+    test = folds == fold
+    # One core per task; the pool provides the parallelism
+    model = candidate_models(1, seed)[name]
+
+    start = time.perf_counter()
+    model.fit(X[~test], y[~test])
+    fitted = time.perf_counter()
+    predicted = model.predict(X[test])
+    finished = time.perf_counter()
+
+    labels = np.unique(y)
+    precision, recall, f1, support = precision_recall_fscore_support(
+        y[test], predicted, labels=labels, zero_division=0
+    )
+    return {
+        'model': name,
+        'fold': int(fold),
+        'accuracy': float(accuracy_score(y[test], predicted)),
+        'precision': precision.tolist(),
+        'recall': recall.tolist(),
+        'f1': f1.tolist(),
+        'support': support.tolist(),
+        'confusion_matrix': confusion_matrix(y[test], predicted, labels=labels).tolist(),
+        'fit_seconds': fitted - start,
+        'predict_seconds': finished - fitted,
+    }
+
+
+def summarize(folds, classes):
+    """Mean and standard deviation over folds, per model."""
+    summary = {}
+    for name in dict.fromkeys(f['model'] for f in folds):
+        runs = [f for f in folds if f['model'] == name]
+        accuracy = np.array([r['accuracy'] for r in runs])
+        entry = {
+            'accuracy_mean': float(accuracy.mean()),
+            'accuracy_std': float(accuracy.std()),
+            'fit_seconds_mean': float(np.mean([r['fit_seconds'] for r in runs])),
+            'predict_seconds_mean': float(np.mean([r['predict_seconds'] for r in runs])),
+            'confusion_matrix': np.sum([r['confusion_matrix'] for r in runs], axis=0).tolist(),
+            'per_class': {},
+        }
+        for i, label in enumerate(classes):
+            entry['per_class'][label] = {
+                metric: float(np.mean([r[metric][i] for r in runs]))
+                for metric in ('precision', 'recall', 'f1')
+            }
+        summary[name] = entry
+    return summary
+
+
+def run(data_path, cache_dir=matrix_cache.DEFAULT_CACHE_DIR, n_folds=DEFAULT_FOLDS, n_jobs=-1, seed=42,
+        models=None):
+    n_jobs = os.cpu_count() if n_jobs in (None, -1) else n_jobs
+    start = time.perf_counter()
+    raw = load_dataset(data_path)
+    path, cached = materialize_folds(raw, cache_dir, n_folds, seed)
+    prepared = time.perf_counter()
+    print(f"Folds {'loaded from' if cached else 'written to'} {path} in {prepared - start:.2f}s", flush=True)
+
+    names = models or list(candidate_models(1, seed))
+    # Slowest model first, so its folds do not end up as the tail of the run
+    names = sorted(names, key=lambda n: n != 'Random Forest')
+    tasks = [(name, fold) for name in names for fold in range(n_folds)]
+    with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks))) as pool:
+        futures = [pool.submit(_evaluate_fold, path, name, fold, n_folds, seed) for name, fold in tasks]
+        folds = []
+        for future in futures:
+            result = future.result()
+            folds.append(result)
+            print(f"  {result['model']:<20} fold {result['fold']}  accuracy {result['accuracy']:.4f}  "
+                  f"fit {result['fit_seconds']:.2f}s", flush=True)
+    finished = time.perf_counter()
+
+    with open(os.path.join(path, matrix_cache.META_FILE)) as f:
+        classes = json.load(f)['classes']
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'data': data_path,
+            'n_rows': len(raw),
+            'n_folds': n_folds,
+            'seed': seed,
+            'workers': min(n_jobs, len(tasks)),
+            'cache': path,
+            'cache_hit': cached,
+            'sklearn': sklearn.__version__,
+            'prepare_seconds': prepared - start,
+            'evaluate_seconds': finished - prepared,
+        },
+        'classes': classes,
+        'models': summarize(folds, classes),
+        'folds': folds,
+    }
+
+
+def plot_confusion_matrices(report, path):
+    """One heatmap per model of the confusion matrix summed over folds."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    classes = report['classes']
+    models = report['models']
+    fig, axes = plt.subplots(1, len(models), figsize=(6 * len(models), 5), squeeze=False)
+    for ax, (name, entry) in zip(axes[0], models.items()):
+        sns.heatmap(np.array(entry['confusion_matrix']), annot=True, fmt='d', cmap='Blues',
+                    xticklabels=classes, yticklabels=classes, ax=ax)
+        ax.set_title(f"Confusion Matrix - {name}")
+        ax.set_xlabel("Predicted")
+        ax.set_ylabel("Actual")
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cross-validate the candidate models")
+    parser.add_argument('--data', default=None,
+                        help="Dataset store directory or CSV/Parquet file (default: as train.py)")
+    parser.add_argument('--folds', type=int, default=DEFAULT_FOLDS)
+    parser.add_argument('--jobs', type=int, default=-1, help="Worker processes (-1 = all cores)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--models', nargs='+', default=None, choices=list(candidate_models(1)),
+                        help="Subset of the candidate models")
+    parser.add_argument('--cache-dir', default=matrix_cache.DEFAULT_CACHE_DIR)
+    parser.add_argument('--output', default='evaluation_report.json')
+    parser.add_argument('--plot', help="Also save the confusion matrices as an image here")
+    args = parser.parse_args(argv)
+
+    report = run(args.data or default_data_path(), args.cache_dir, args.folds, args.jobs, args.seed, args.models)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'model':<20} {'accuracy':>14} {'fit s':>8}")
+    for name, entry in report['models'].items():
+        print(f"{name:<20} {entry['accuracy_mean']:.4f} ± {entry['accuracy_std']:.4f} "
+              f"{entry['fit_seconds_mean']:>8.2f}")
+    print(f"Evaluated in {report['meta']['evaluate_seconds']:.2f}s -> {args.output}")
+    if args.plot:
+        plot_confusion_matrices(report, args.plot)
+        print(f"Confusion matrices -> {args.plot}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import numpy as np
+
+from features import ENGINEERED_SOURCES
+
+
+def field_groups(encoder, fields):
+    """A (n_columns, n_fields + 1) matrix that sums model columns back into
+    the form ``fields``.
+
+    One-hot and numeric columns go to their own field. An engineered
+    feature is split evenly over the columns it is computed from
+    (``ENGINEERED_SOURCES``). Whatever does not come from a form field, such
+    as the dataset columns a bundle imputes for a form submission, lands in
+    the last column, so it never shows up as a reason.
+    """
+    position = {field: i for i, field in enumerate(fields)}
+    other = len(fields)
+    groups = np.zeros((len(encoder.source_fields), len(fields) + 1))
+    for column, source in enumerate(encoder.source_fields):
+        inputs = ENGINEERED_SOURCES.get(source, [source])
+        for field in inputs:
+            groups[column, position.get(field, other)] += 1.0 / len(inputs)
+    return groups
+
+
+def explain_matrix(forest, encoder, input_data, fields):
+    """Per-field contributions to the predicted class for every row.
+
+    Returns ``(labels, probabilities, base, contributions, other)``: the
+    predicted class and its probability per row, the forest's average
+    probability for that class before any split, a (n_rows, n_fields)
+    array for the form ``fields`` and the per-row remainder from columns
+    outside them. ``base + contributions.sum(axis=1) + other`` is the
+    predicted probability.
+    """
+    # (rows, columns, classes) -> (rows, fields, classes), one chunk at a time
+    bias, by_field = forest.contributions(input_data, groups=field_groups(encoder, fields))
+    # Every column belongs to exactly one field or to the remainder, so the sums agree
+    proba = bias + by_field.sum(axis=1)
+    predicted = np.argmax(proba, axis=1)
+    rows = np.arange(len(predicted))
+    chosen = by_field[rows, :, predicted]
+    return (
+        np.asarray(forest.classes_)[predicted],
+        proba[rows, predicted],
+        bias[predicted],
+        chosen[:, :-1],
+        chosen[:, -1],
+    )
+
+
+def top_factors(fields, contributions, top=5):
+    """The ``top`` fields with the largest effect on one row, as (field, value)."""
+    order = np.argsort(-np.abs(contributions))[:top]
+    return [(fields[i], float(contributions[i])) for i in order if contributions[i] != 0]
+
+
+def format_factors(factors):
+    # Compact form for a CSV cell, e.g. "Curricular_units_2nd_sem_approved -0.21; Debtor +0.08"
+    return '; '.join(f"{field} {value:+.3f}" for field, value in factors)
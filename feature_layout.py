@@ -0,0 +1,86 @@
+import numpy as np
+
+
+class FeatureLayout:
+    """Fixed column map from form fields to the model's input columns.
+
+    Column order matches what the old DataFrame encoder produced: the
+    non-categorical fields in ``feature_names`` order, then one dummy column
+    per expected category, then zero padding up to ``n_features``.
+    """
+
+    def __init__(self, feature_names, categorical_features, expected_categories, n_features=259):
+        self.feature_names = list(feature_names)
+        self.categorical_features = list(categorical_features)
+        self.expected_categories = {f: list(expected_categories[f]) for f in self.categorical_features}
+        self.numeric_fields = [f for f in self.feature_names if f not in self.categorical_features]
+
+        columns = list(self.numeric_fields)
+        dummy_columns = []
+        for feature in self.categorical_features:
+            for value in expected_categories[feature]:
+                dummy_columns.append((feature, value, len(columns)))
+                columns.append(f"{feature}_{value}")
+
+        # Pad with zero columns, or cut off extras, to reach the model width
+        for i in range(max(n_features - len(columns), 0)):
+            columns.append(f"missing_feature_{i}")
+        self.columns = columns[:n_features]
+        self.n_features = n_features
+
+        self.numeric_index = np.arange(len(self.numeric_fields))
+        self.numeric_index = self.numeric_index[self.numeric_index < n_features]
+        self.category_index = {feature: {} for feature in self.categorical_features}
+        for feature, value, index in dummy_columns:
+            if index < n_features:
+                self.category_index[feature][value] = index
+
+        # Which form field each model column came from (None for padding)
+        self.source_fields = [None] * n_features
+        for index in self.numeric_index:
+            self.source_fields[index] = self.numeric_fields[index]
+        for feature, mapping in self.category_index.items():
+            for index in mapping.values():
+                self.source_fields[index] = feature
+
+    def to_dict(self):
+        return {
+            'feature_names': self.feature_names,
+            'categorical_features': self.categorical_features,
+            'expected_categories': self.expected_categories,
+            'n_features': self.n_features,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def encode(self, record):
+        # Single form dict -> (1, n_features) float32 row
+        row = np.zeros((1, self.n_features), dtype=np.float32)
+        for index in self.numeric_index:
+            row[0, index] = record[self.numeric_fields[index]]
+        for feature, mapping in self.category_index.items():
+            index = mapping.get(record[feature])
+            if index is not None:
+                row[0, index] = 1.0
+        return row
+
+    def encode_records(self, records):
+        columns = {field: np.asarray([r[field] for r in records]) for field in self.feature_names}
+        return self.encode_columns(columns, len(records))
+
+    def encode_frame(self, frame):
+        columns = {field: frame[field].to_numpy() for field in self.feature_names}
+        return self.encode_columns(columns, len(frame))
+
+    def encode_columns(self, columns, n_rows):
+        # Column arrays -> (n_rows, n_features) float32 matrix, one pass per field
+        matrix = np.zeros((n_rows, self.n_features), dtype=np.float32)
+        for index in self.numeric_index:
+            matrix[:, index] = columns[self.numeric_fields[index]]
+        for feature, mapping in self.category_index.items():
+            values = columns[feature]
+            for value, index in mapping.items():
+                matrix[:, index] = values == value
+        return matrix
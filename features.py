@@ -0,0 +1,116 @@
+"""Feature definitions shared by training, data refresh and serving.
+
+These mirror the "Feature Engineering" cell of DS_CaseStudy_Agum_Medisa.ipynb.
+"""
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+TARGET = 'Status'
+
+CATEGORICAL_FEATURES = [
+    'Marital_status', 'Application_mode', 'Course', 'Daytime_evening_attendance',
+    'Previous_qualification', 'Nacionality', 'Mothers_qualification',
+    'Fathers_qualification', 'Mothers_occupation', 'Fathers_occupation',
+    'Displaced', 'Educational_special_needs', 'Debtor',
+    'Tuition_fees_up_to_date', 'Gender', 'Scholarship_holder',
+    'International'
+]
+
+ENGINEERED_FEATURES = [
+    'Total_Approved_Units', 'Average_Grade', 'Engagement_Score', 'Dropout_Risk_Score'
+]
+
+
+# Raw columns each engineered feature is computed from (see engineered_columns)
+ENGINEERED_SOURCES = {
+    'Total_Approved_Units': ['Curricular_units_1st_sem_approved', 'Curricular_units_2nd_sem_approved'],
+    'Average_Grade': ['Curricular_units_1st_sem_grade', 'Curricular_units_2nd_sem_grade'],
+    'Engagement_Score': ['Curricular_units_1st_sem_evaluations', 'Curricular_units_2nd_sem_evaluations',
+                         'Curricular_units_1st_sem_enrolled', 'Curricular_units_2nd_sem_enrolled'],
+    'Dropout_Risk_Score': ['Debtor', 'Tuition_fees_up_to_date', 'Admission_grade'],
+}
+
+ENGINEERED_INPUTS = [
+    'Curricular_units_1st_sem_approved', 'Curricular_units_2nd_sem_approved',
+    'Curricular_units_1st_sem_grade', 'Curricular_units_2nd_sem_grade',
+    'Curricular_units_1st_sem_evaluations', 'Curricular_units_2nd_sem_evaluations',
+    'Curricular_units_1st_sem_enrolled', 'Curricular_units_2nd_sem_enrolled',
+    'Debtor', 'Tuition_fees_up_to_date', 'Admission_grade',
+]
+
+
+def engineered_columns(columns):
+    """Compute the engineered features from a mapping of column -> array.
+
+    Works on a DataFrame or on a plain dict of NumPy arrays, so the serving
+    path can use it without building a frame. Missing inputs propagate NaN.
+    """
+    def col(name):
+        return np.asarray(columns[name], dtype=np.float64)
+
+    # Row mean that skips NaN like DataFrame.mean(axis=1); all-NaN rows stay NaN
+    grade_1st = col("Curricular_units_1st_sem_grade")
+    grade_2nd = col("Curricular_units_2nd_sem_grade")
+    average_grade = np.where(
+        np.isnan(grade_1st), grade_2nd, np.where(np.isnan(grade_2nd), grade_1st, (grade_1st + grade_2nd) / 2)
+    )
+
+    return {
+        "Total_Approved_Units": col("Curricular_units_1st_sem_approved") + col("Curricular_units_2nd_sem_approved"),
+        "Average_Grade": average_grade,
+        "Engagement_Score": (
+            col("Curricular_units_1st_sem_evaluations") + col("Curricular_units_2nd_sem_evaluations")
+        ) / (
+            col("Curricular_units_1st_sem_enrolled") + col("Curricular_units_2nd_sem_enrolled") + 1e-5
+        ),
+        "Dropout_Risk_Score": (
+            col("Debtor") * 2 +
+            (1 - col("Tuition_fees_up_to_date")) +
+            (20 - col("Admission_grade")) / 20
+        ),
+    }
+
+
+def add_engineered_features(df):
+    df = df.copy()
+    for name, values in engineered_columns(df).items():
+        df[name] = values
+    # Integer inputs give integer totals, as in the notebook
+    if all(pd.api.types.is_integer_dtype(df[c]) for c in
+           ("Curricular_units_1st_sem_approved", "Curricular_units_2nd_sem_approved")):
+        # int64 rather than the input dtype: compacted int8 inputs could overflow the sum
+        df["Total_Approved_Units"] = df["Total_Approved_Units"].astype(np.int64)
+    return df
+
+
+def split_features(df):
+    """Separate features from the target and list the numeric columns.
+
+    Numeric columns keep the table's column order (the notebook used a set,
+    which made the processed column order change between runs).
+    """
+    X = df.drop(columns=[TARGET])
+    y = df[TARGET]
+    numerical_features = [c for c in X.columns if c not in CATEGORICAL_FEATURES]
+    return X, y, numerical_features
+
+
+def build_preprocessor(numerical_features, categorical_features=CATEGORICAL_FEATURES):
+    numeric_pipeline = Pipeline(steps=[
+        ("imputer", SimpleImputer(strategy="mean")),
+        ("scaler", StandardScaler())
+    ])
+
+    categorical_pipeline = Pipeline(steps=[
+        ("imputer", SimpleImputer(strategy="most_frequent")),
+        ("encoder", OneHotEncoder(handle_unknown="ignore"))
+    ])
+
+    return ColumnTransformer(transformers=[
+        ("num", numeric_pipeline, list(numerical_features)),
+        ("cat", categorical_pipeline, list(categorical_features))
+    ])
@@ -0,0 +1,151 @@
+import numpy as np
+
+
+class FlatForest:
+    """A fitted random forest flattened into contiguous node arrays.
+
+    All trees share one set of arrays; ``roots`` holds the index of each
+    tree's first node and leaves point to themselves. A batch of rows is
+    walked down every tree at once, one level per step. ``value`` holds the
+    class distribution of every node (not only leaves).
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, classes, is_leaf=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+        self.is_leaf = left == np.arange(len(left)) if is_leaf is None else is_leaf
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def apply(self, X):
+        """Leaf index reached in every tree, shape (n_rows, n_trees)."""
+        # sklearn compares float32 inputs against float64 thresholds; do the same
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+
+        # One entry per (row, tree) pair; entries drop out once they hit a leaf
+        node = np.tile(self.roots, n_rows)
+        row_base = np.repeat(np.arange(n_rows, dtype=np.int64) * n_features, self.n_trees)
+        active = np.arange(node.size)
+        while active.size:
+            current = node[active]
+            go_left = flat_X[row_base[active] + self.feature[current]] <= self.threshold[current]
+            current = np.where(go_left, self.left[current], self.right[current])
+            node[active] = current
+            active = active[~self.is_leaf[current]]
+        return node.reshape(n_rows, self.n_trees)
+
+    def predict_proba(self, X, chunk_size=1024):
+        X = np.asarray(X, dtype=np.float32)
+        proba = np.empty((X.shape[0], len(self.classes_)), dtype=np.float64)
+        # Chunk rows so the (rows, trees) index arrays stay cache-sized
+        for start in range(0, X.shape[0], chunk_size):
+            leaves = self.apply(X[start:start + chunk_size])
+            total = np.zeros((leaves.shape[0], len(self.classes_)), dtype=np.float64)
+            # Accumulate tree by tree, in the same order sklearn does
+            for t in range(leaves.shape[1]):
+                total += self.value[leaves[:, t]]
+            proba[start:start + chunk_size] = total / self.n_trees
+        return proba
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def contributions(self, X, chunk_size=1024, groups=None):
+        """Tree-path decomposition of ``predict_proba``.
+
+        Every split a row passes moves its class distribution from the
+        parent's ``value`` to the child's; that change is credited to the
+        split feature. Returns ``(bias, contributions)`` with bias of shape
+        (n_classes,) and contributions of shape (n_rows, n_features,
+        n_classes), so ``bias + contributions.sum(axis=1)`` equals
+        ``predict_proba(X)``.
+
+        ``groups``, an (n_features, n_groups) matrix, sums the features into
+        groups chunk by chunk; the result is then (n_rows, n_groups,
+        n_classes) and the per-feature array never exists for the whole batch.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        n_classes = len(self.classes_)
+        bias = self.value[self.roots].mean(axis=0)
+        width = X.shape[1] if groups is None else groups.shape[1]
+        out = np.empty((X.shape[0], width, n_classes), dtype=np.float64)
+        for start in range(0, X.shape[0], chunk_size):
+            chunk = self._contributions(X[start:start + chunk_size])
+            if groups is not None:
+                chunk = np.einsum('rck,cf->rfk', chunk, groups)
+            out[start:start + chunk_size] = chunk
+        return bias, out
+
+    def _contributions(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        n_classes = len(self.classes_)
+        flat_X = X.ravel()
+        total = np.zeros((n_rows * n_features, n_classes), dtype=np.float64)
+
+        # Same walk as apply(), one level at a time for every (row, tree) pair
+        node = np.tile(self.roots, n_rows)
+        row_base = np.repeat(np.arange(n_rows, dtype=np.int64) * n_features, self.n_trees)
+        active = np.arange(node.size)
+        while active.size:
+            current = node[active]
+            split = self.feature[current]
+            go_left = flat_X[row_base[active] + split] <= self.threshold[current]
+            child = np.where(go_left, self.left[current], self.right[current])
+            delta = self.value[child] - self.value[current]
+            # bincount per class is much faster than np.add.at for the scatter
+            target = row_base[active] + split
+            for k in range(n_classes):
+                total[:, k] += np.bincount(target, weights=delta[:, k], minlength=total.shape[0])
+            node[active] = child
+            active = active[~self.is_leaf[child]]
+        return total.reshape(n_rows, n_features, n_classes) / self.n_trees
+
+
+def export_forest(model):
+    """Flatten a fitted sklearn RandomForestClassifier into a FlatForest."""
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        node_ids = np.arange(n_nodes)
+        is_leaf = tree.children_left == -1
+
+        roots.append(offset)
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+        lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+        rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+
+        value = tree.value[:, 0, :].astype(np.float64)
+        values.append(value / value.sum(axis=1, keepdims=True))
+
+        max_depth = max(max_depth, tree.max_depth)
+        offset += n_nodes
+
+    return FlatForest(
+        feature=np.concatenate(features).astype(np.int32),
+        threshold=np.concatenate(thresholds).astype(np.float64),
+        left=np.concatenate(lefts).astype(np.int32),
+        right=np.concatenate(rights).astype(np.int32),
+        value=np.concatenate(values),
+        roots=np.asarray(roots, dtype=np.int32),
+        max_depth=max_depth,
+        classes=np.asarray(model.classes_),
+    )
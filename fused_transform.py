@@ -0,0 +1,191 @@
+import numpy as np
+
+from features import ENGINEERED_FEATURES, ENGINEERED_INPUTS, engineered_columns
+
+
+class FusedTransform:
+    """The fitted ColumnTransformer compiled into plain index/affine maps.
+
+    Numeric columns become ``x * scale + offset`` (mean imputation folded in
+    for missing values), one-hot columns become a sorted category array plus
+    an output offset. A raw student record (or a batch of them) is turned
+    into the model's input in one pass, without building a DataFrame.
+    """
+
+    def __init__(self, numeric_fields, numeric_positions, impute_values, scale, offset,
+                 categorical_fields, categories, category_offsets, category_fill, n_features):
+        self.numeric_fields = list(numeric_fields)
+        self.numeric_positions = np.asarray(numeric_positions, dtype=np.int64)
+        self.impute_values = np.asarray(impute_values, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.offset = np.asarray(offset, dtype=np.float64)
+        self.categorical_fields = list(categorical_fields)
+        self.categories = [np.asarray(c, dtype=np.float64) for c in categories]
+        self.category_offsets = [int(o) for o in category_offsets]
+        self.category_fill = [float(v) for v in category_fill]
+        self.n_features = int(n_features)
+        self.feature_names = self.numeric_fields + self.categorical_fields
+        self._input_fields = sorted(set(self.feature_names) | set(ENGINEERED_INPUTS))
+        self._category_positions = [
+            {float(value): start + i for i, value in enumerate(cats)}
+            for cats, start in zip(self.categories, self.category_offsets)
+        ]
+
+        # Which raw field each model column came from
+        self.source_fields = [None] * self.n_features
+        for field, position in zip(self.numeric_fields, self.numeric_positions):
+            self.source_fields[position] = field
+        for field, cats, start in zip(self.categorical_fields, self.categories, self.category_offsets):
+            for i in range(len(cats)):
+                self.source_fields[start + i] = field
+
+    @classmethod
+    def from_column_transformer(cls, preprocessor):
+        numeric = preprocessor.named_transformers_['num']
+        categorical = preprocessor.named_transformers_['cat']
+        numeric_fields = _transformer_columns(preprocessor, 'num')
+        categorical_fields = _transformer_columns(preprocessor, 'cat')
+        num_slice = preprocessor.output_indices_['num']
+        cat_slice = preprocessor.output_indices_['cat']
+
+        # imputer -> (x - mean) / scale, folded into x * a + b
+        scaler = numeric.named_steps['scaler']
+        mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(len(numeric_fields))
+        std = scaler.scale_ if scaler.scale_ is not None else np.ones(len(numeric_fields))
+
+        encoder = categorical.named_steps['encoder']
+        infrequent = getattr(encoder, 'infrequent_categories_', None) or []
+        if encoder.drop_idx_ is not None or any(c is not None for c in infrequent):
+            raise ValueError("Only plain one-hot encoding (no drop/infrequent) can be compiled")
+        offsets = []
+        position = cat_slice.start
+        for cats in encoder.categories_:
+            offsets.append(position)
+            position += len(cats)
+
+        return cls(
+            numeric_fields=numeric_fields,
+            numeric_positions=np.arange(num_slice.start, num_slice.stop),
+            impute_values=numeric.named_steps['imputer'].statistics_,
+            scale=1.0 / std,
+            offset=-mean / std,
+            categorical_fields=categorical_fields,
+            categories=encoder.categories_,
+            category_offsets=offsets,
+            category_fill=categorical.named_steps['imputer'].statistics_,
+            n_features=position,
+        )
+
+    def to_dict(self):
+        return {
+            'numeric_fields': self.numeric_fields,
+            'numeric_positions': self.numeric_positions.tolist(),
+            'impute_values': self.impute_values.tolist(),
+            'scale': self.scale.tolist(),
+            'offset': self.offset.tolist(),
+            'categorical_fields': self.categorical_fields,
+            'categories': [c.tolist() for c in self.categories],
+            'category_offsets': self.category_offsets,
+            'category_fill': self.category_fill,
+            'n_features': self.n_features,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def encode(self, record):
+        # Single record: dict lookups for the one-hot part beat array ops here
+        columns = self._read_records([record])
+        row = np.zeros((1, self.n_features), dtype=np.float32)
+        row[0, self.numeric_positions] = self._numeric_block(columns)[0]
+        for field, positions, fill in zip(self.categorical_fields, self._category_positions,
+                                          self.category_fill):
+            value = float(columns[field][0])
+            position = positions.get(fill if np.isnan(value) else value)
+            if position is not None:
+                row[0, position] = 1.0
+        return row
+
+    def encode_records(self, records):
+        return self.encode_columns(self._read_records(records), len(records))
+
+    def encode_frame(self, frame):
+        columns = {
+            field: frame[field].to_numpy(dtype=np.float64) if field in frame.columns
+            else np.full(len(frame), np.nan)
+            for field in self._input_fields
+        }
+        return self.encode_columns(columns, len(frame))
+
+    def _read_records(self, records):
+        # Fields a record does not carry (e.g. from the short app form) are NaN
+        # and get imputed exactly as SimpleImputer would
+        values = np.array([[r.get(field, np.nan) for field in self._input_fields] for r in records],
+                          dtype=np.float64).reshape(len(records), len(self._input_fields))
+        return dict(zip(self._input_fields, values.T))
+
+    def _numeric_block(self, columns):
+        # Engineered features are derived from the raw inputs where not supplied
+        engineered = [f for f in ENGINEERED_FEATURES if f in self.numeric_fields]
+        if engineered and all(f in columns for f in ENGINEERED_INPUTS):
+            derived = engineered_columns(columns)
+            columns = dict(columns)
+            for f in engineered:
+                supplied = columns.get(f)
+                columns[f] = derived[f] if supplied is None else np.where(np.isnan(supplied), derived[f], supplied)
+
+        raw = np.column_stack([columns[field] for field in self.numeric_fields])
+        raw = np.where(np.isnan(raw), self.impute_values, raw)
+        return raw * self.scale + self.offset
+
+    def encode_columns(self, columns, n_rows):
+        matrix = np.zeros((n_rows, self.n_features), dtype=np.float32)
+        matrix[:, self.numeric_positions] = self._numeric_block(columns)
+
+        rows = np.arange(n_rows)
+        for field, cats, start, fill in zip(self.categorical_fields, self.categories,
+                                            self.category_offsets, self.category_fill):
+            values = np.asarray(columns[field], dtype=np.float64) if field in columns \
+                else np.full(n_rows, np.nan)
+            values = np.where(np.isnan(values), fill, values)
+            index = np.searchsorted(cats, values)
+            index = np.minimum(index, len(cats) - 1)
+            known = cats[index] == values  # unknown categories stay all-zero
+            matrix[rows[known], start + index[known]] = 1.0
+        return matrix
+
+
+def _transformer_columns(preprocessor, name):
+    for transformer_name, _, columns in preprocessor.transformers_:
+        if transformer_name == name:
+            return list(columns)
+    raise ValueError(f"Preprocessor has no '{name}' transformer")
+
+
+BUNDLE_FORMAT = 'student_model_bundle'
+BUNDLE_VERSION = 1
+
+
+def make_bundle(preprocessor, model, classes):
+    """The fitted preprocessor and classifier, saved as one artifact."""
+    return {
+        'format': BUNDLE_FORMAT,
+        'version': BUNDLE_VERSION,
+        'preprocessor': preprocessor,
+        'model': model,
+        'classes': list(classes),
+    }
+
+
+def is_bundle(obj):
+    return isinstance(obj, dict) and obj.get('format') == BUNDLE_FORMAT
+
+
+def bundle_model(obj):
+    # The classifier inside a bundle, or the object itself for a plain model
+    return obj['model'] if is_bundle(obj) else obj
+
+
+def compile_bundle(bundle):
+    return FusedTransform.from_column_transformer(bundle['preprocessor'])
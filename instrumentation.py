@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# Seconds; spans a cached form lookup (~50 µs) up to a large batch or a cold load
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIX = 'student_dropout'
+
+
+class Histogram:
+    """Cumulative Prometheus buckets, plus the most recent samples for percentiles."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window=1024):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def percentiles(self, qs=(50, 95, 99)):
+        if not self.recent:
+            return [None] * len(qs)
+        return [float(v) for v in np.percentile(np.fromiter(self.recent, dtype=float), qs)]
+
+
+class Metrics:
+    """Per-stage timers, counters and sampled peak memory for one process.
+
+    Cheap enough to stay on: a timed stage costs two ``perf_counter`` calls,
+    a lock and a bisect. With ``tracemalloc_every=N`` every Nth call of a
+    stage also records its peak Python allocation; tracing is only switched
+    on for that one call.
+    """
+
+    def __init__(self, tracemalloc_every=0, window=1024, textfile=None, export_interval=15.0):
+        self.tracemalloc_every = tracemalloc_every
+        self.window = window
+        self.textfile = textfile
+        self.export_interval = export_interval
+        self.started_at = time.time()
+        self.histograms = {}
+        self.counters = {}
+        self.peak_bytes = {}
+        self._calls = {}
+        self._last_export = 0.0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def timer(self, stage):
+        sample = False
+        if self.tracemalloc_every:
+            with self._lock:
+                calls = self._calls[stage] = self._calls.get(stage, 0) + 1
+            # Never stop a trace someone else started
+            sample = calls % self.tracemalloc_every == 0 and not tracemalloc.is_tracing()
+            if sample:
+                tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if sample:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                self.peak_bytes[stage] = peak
+            self.observe(stage, elapsed)
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram(window=self.window)
+            histogram.observe(seconds)
+
+    def inc(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            stages = {}
+            for stage, h in self.histograms.items():
+                p50, p95, p99 = h.percentiles()
+                stages[stage] = {
+                    'count': h.count,
+                    'mean_ms': h.sum / h.count * 1000 if h.count else None,
+                    'p50_ms': p50 * 1000, 'p95_ms': p95 * 1000, 'p99_ms': p99 * 1000,
+                    'peak_mb': self.peak_bytes[stage] / 1e6 if stage in self.peak_bytes else None,
+                }
+            return {'stages': stages, 'counters': dict(self.counters),
+                    'uptime_seconds': time.time() - self.started_at}
+
+    def render_prometheus(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            lines += [f'# HELP {PREFIX}_stage_seconds Time spent in each prediction stage',
+                      f'# TYPE {PREFIX}_stage_seconds histogram']
+            for stage, h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(_bucket_labels(h), h.counts):
+                    cumulative += count
+                    lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{stage}"}} {h.sum!r}')
+                lines.append(f'{PREFIX}_stage_seconds_count{{stage="{stage}"}} {h.count}')
+
+            for name, value in sorted(self.counters.items()):
+                lines += [f'# TYPE {PREFIX}_{name} counter', f'{PREFIX}_{name} {value}']
+
+            if self.peak_bytes:
+                lines += [f'# HELP {PREFIX}_stage_peak_bytes Peak traced allocation of the last sampled call',
+                          f'# TYPE {PREFIX}_stage_peak_bytes gauge']
+                for stage, peak in sorted(self.peak_bytes.items()):
+                    lines.append(f'{PREFIX}_stage_peak_bytes{{stage="{stage}"}} {peak}')
+
+        lines += [f'# TYPE {PREFIX}_uptime_seconds gauge',
+                  f'{PREFIX}_uptime_seconds {time.time() - self.started_at:.1f}']
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path=None):
+        # Written aside and renamed, so a scraper never reads half a file
+        path = path or self.textfile
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def maybe_export(self):
+        """Write the textfile if one is configured and the last write is stale."""
+        if not self.textfile:
+            return False
+        now = time.monotonic()
+        if now - self._last_export < self.export_interval:
+            return False
+        self._last_export = now
+        self.write_textfile()
+        return True
+
+
+def _bucket_labels(histogram):
+    return [repr(float(b)) for b in histogram.buckets] + ['+Inf']
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    # One set per process, shared by every session like the model registry.
+    # METRICS_FILE and METRICS_TRACEMALLOC_EVERY switch on the optional parts.
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = Metrics(
+                tracemalloc_every=int(os.environ.get('METRICS_TRACEMALLOC_EVERY', 0) or 0),
+                textfile=os.environ.get('METRICS_FILE') or None,
+            )
+        return _metrics
@@ -0,0 +1,179 @@
+"""Background scoring jobs that outlive the Streamlit run that started them.
+
+Every job is a directory under ``jobs/``:
+
+* ``input.csv``: the uploaded file
+* ``status.json``: state, progress and timings, rewritten after every chunk
+* ``result.csv``: predictions, appended chunk by chunk
+* ``cancel``: marker file; the worker stops at the next chunk boundary
+
+Jobs run on a thread pool shared by every session in the process, so a
+browser reload (or closing the tab) does not stop them; the page just
+reads ``status.json`` again. Jobs that were still queued or running when
+the process exited are marked ``interrupted`` on the next start.
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from batch_scoring import iter_scored_chunks, summarize_chunk_stats
+from model_registry import default_model_path
+from predictor import StudentPredictor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS_DIR = 'jobs'
+STATUS_FILE = 'status.json'
+INPUT_FILE = 'input.csv'
+RESULT_FILE = 'result.csv'
+CANCEL_FILE = 'cancel'
+FINISHED = ('done', 'failed', 'cancelled', 'interrupted')
+
+
+class JobQueue:
+    def __init__(self, directory=DEFAULT_JOBS_DIR, workers=2, model_path=None, keep=50):
+        self.directory = directory
+        self.model_path = model_path
+        self.keep = keep
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scoring-job')
+        self._futures = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._mark_interrupted()
+
+    def submit(self, source, name, chunksize=10000, explain_top=0):
+        """Copy ``source`` (a binary file object) into a new job and queue it."""
+        job_id = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+        job_dir = self._job_dir(job_id)
+        os.makedirs(job_dir)
+        with open(os.path.join(job_dir, INPUT_FILE), 'wb') as f:
+            shutil.copyfileobj(source, f)
+        self._write_status(job_id, {
+            'id': job_id, 'name': name, 'state': 'queued', 'chunksize': chunksize,
+            'explain_top': explain_top, 'rows': 0, 'progress': 0.0,
+            'created_at': time.time(), 'started_at': None, 'finished_at': None,
+            'summary': None, 'error': None,
+        })
+        with self._lock:
+            self._futures[job_id] = self._executor.submit(self._run, job_id)
+        self._prune()
+        return job_id
+
+    def status(self, job_id):
+        if not _valid_id(job_id):
+            return None
+        path = os.path.join(self._job_dir(job_id), STATUS_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def jobs(self, limit=20):
+        """Most recent jobs first."""
+        statuses = [self.status(job_id) for job_id in sorted(os.listdir(self.directory), reverse=True)[:limit]]
+        return [s for s in statuses if s is not None]
+
+    def cancel(self, job_id):
+        status = self.status(job_id)
+        if status is None or status['state'] in FINISHED:
+            return False
+        open(os.path.join(self._job_dir(job_id), CANCEL_FILE), 'w').close()
+        with self._lock:
+            future = self._futures.get(job_id)
+        # Not started yet: drop it from the pool; a running job sees the marker
+        if future is not None and future.cancel():
+            self._update(job_id, state='cancelled', finished_at=time.time())
+        return True
+
+    def result_path(self, job_id):
+        return os.path.join(self._job_dir(job_id), RESULT_FILE)
+
+    def _run(self, job_id):
+        job_dir = self._job_dir(job_id)
+        status = self._update(job_id, state='running', started_at=time.time())
+        try:
+            predictor = StudentPredictor(self.model_path or default_model_path(bulk=True))
+            if not predictor.load_model():
+                raise RuntimeError(f"Could not load model from {predictor.registry.path}")
+
+            input_path = os.path.join(job_dir, INPUT_FILE)
+            size = max(os.path.getsize(input_path), 1)
+            chunk_stats = []
+            with open(input_path, 'rb') as source, open(self.result_path(job_id), 'w', newline='') as output:
+                for results, stats in iter_scored_chunks(predictor, source, status['chunksize'],
+                                                         status['explain_top']):
+                    results.to_csv(output, index=False, header=not chunk_stats)
+                    output.flush()
+                    chunk_stats.append(stats)
+                    if os.path.exists(os.path.join(job_dir, CANCEL_FILE)):
+                        self._update(job_id, state='cancelled', finished_at=time.time(),
+                                     rows=sum(s['rows'] for s in chunk_stats))
+                        return
+                    self._update(job_id, rows=sum(s['rows'] for s in chunk_stats),
+                                 progress=min(source.tell() / size, 1.0))
+            self._update(job_id, state='done', progress=1.0, finished_at=time.time(),
+                         summary=summarize_chunk_stats(chunk_stats))
+        except Exception as e:
+            logger.exception("Scoring job %s failed", job_id)
+            self._update(job_id, state='failed', finished_at=time.time(), error=str(e))
+        finally:
+            with self._lock:
+                self._futures.pop(job_id, None)
+
+    def _job_dir(self, job_id):
+        if not _valid_id(job_id):
+            raise ValueError(f"Invalid job id {job_id!r}")
+        return os.path.join(self.directory, job_id)
+
+    def _update(self, job_id, **changes):
+        status = self.status(job_id)
+        status.update(changes)
+        self._write_status(job_id, status)
+        return status
+
+    def _write_status(self, job_id, status):
+        # Written aside and renamed, so a page never reads half a file
+        path = os.path.join(self._job_dir(job_id), STATUS_FILE)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(status, f)
+        os.replace(tmp_path, path)
+
+    def _mark_interrupted(self):
+        for status in self.jobs(limit=None):
+            if status['state'] not in FINISHED:
+                self._update(status['id'], state='interrupted', finished_at=time.time())
+
+    def _prune(self):
+        # Keep the newest ``keep`` jobs; never remove one that is still going
+        for status in self.jobs(limit=None)[self.keep:]:
+            if status['state'] in FINISHED:
+                shutil.rmtree(self._job_dir(status['id']), ignore_errors=True)
+
+
+def _valid_id(job_id):
+    # Job ids come from the URL, so never let one point outside the jobs folder
+    return bool(job_id) and os.path.basename(job_id) == job_id and job_id not in ('.', '..')
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    # One pool per process, shared by every session like the model registry.
+    # JOBS_DIR and JOB_WORKERS override the defaults.
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue(
+                directory=os.environ.get('JOBS_DIR') or DEFAULT_JOBS_DIR,
+                workers=int(os.environ.get('JOB_WORKERS', 2) or 2),
+            )
+        return _queue
@@ -0,0 +1,156 @@
+"""On-disk cache of the preprocessed training matrix.
+
+    python matrix_cache.py --data data_store
+    python matrix_cache.py --clear
+
+Feature engineering and ``preprocessor.fit_transform`` give the same
+result for the same input, so train.py and evaluate.py keep it under
+``.matrix_cache/<key>/``. The key is a hash of the input rows, the
+feature-engineering code (features.py) and the preprocessor's
+configuration. Any change to one of those gives a new entry, never a stale
+one. An entry holds the CSR components (``data.npy``, ``indices.npy``,
+``indptr.npy``), the encoded labels (``y.npy``), the fitted preprocessor
+(``preprocessor.pkl``) and ``meta.json``. The arrays are opened
+memory-mapped, so loading an entry reads no matrix data up front, and
+processes that load the same entry share its pages.
+"""
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import shutil
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import sklearn
+from scipy import sparse
+from sklearn.preprocessing import LabelEncoder
+
+import features
+from features import add_engineered_features, build_preprocessor, split_features
+
+DEFAULT_CACHE_DIR = '.matrix_cache'
+META_FILE = 'meta.json'
+PREPROCESSOR_FILE = 'preprocessor.pkl'
+ARRAYS = ('data', 'indices', 'indptr', 'y')
+
+
+class ProcessedMatrix:
+    """The preprocessed rows of one dataset, as train.py fits on them."""
+
+    def __init__(self, key, X, y, classes, preprocessor, numerical_features, hit):
+        self.key = key
+        self.X = X
+        self.y = y
+        self.classes = classes
+        self.preprocessor = preprocessor
+        self.numerical_features = numerical_features
+        # False when this call had to build the entry
+        self.hit = hit
+
+
+def cache_key(raw):
+    """Hash of the rows, the feature-engineering code and the preprocessor setup."""
+    _, _, numerical_features = split_features(raw)
+    params = build_preprocessor(numerical_features).get_params(deep=True)
+    digest = hashlib.sha1()
+    digest.update(pd.util.hash_pandas_object(raw, index=False).to_numpy().tobytes())
+    digest.update(json.dumps([list(raw.columns), raw.dtypes.astype(str).tolist()]).encode())
+    digest.update(inspect.getsource(features).encode())
+    # Nested estimators repr as their non-default parameters, which is what matters here
+    digest.update(json.dumps(params, sort_keys=True, default=repr).encode())
+    digest.update(sklearn.__version__.encode())
+    return digest.hexdigest()[:20]
+
+
+def entry_path(key, cache_dir=DEFAULT_CACHE_DIR):
+    return os.path.join(cache_dir, key)
+
+
+def build(raw):
+    """Feature engineering and preprocessing, as the notebook does them."""
+    df = add_engineered_features(raw)
+    X, y, numerical_features = split_features(df)
+    preprocessor = build_preprocessor(numerical_features)
+    X_processed = sparse.csr_matrix(preprocessor.fit_transform(X))
+    label_encoder = LabelEncoder()
+    y_encoded = label_encoder.fit_transform(y)
+    return X_processed, y_encoded, label_encoder.classes_.astype(str).tolist(), preprocessor, numerical_features
+
+
+def save(path, X, y, classes, preprocessor, numerical_features):
+    # Written aside and renamed, so a killed run never leaves a half entry
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    os.makedirs(tmp_path, exist_ok=True)
+    X.sort_indices()
+    arrays = {'data': X.data, 'indices': X.indices, 'indptr': X.indptr, 'y': y}
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_path, f'{name}.npy'), np.ascontiguousarray(array))
+    with open(os.path.join(tmp_path, PREPROCESSOR_FILE), 'wb') as f:
+        pickle.dump(preprocessor, f)
+    with open(os.path.join(tmp_path, META_FILE), 'w') as f:
+        json.dump({'shape': list(X.shape), 'nnz': int(X.nnz), 'classes': list(classes),
+                   'numerical_features': list(numerical_features), 'sklearn': sklearn.__version__,
+                   'created_at': time.time()}, f, indent=2)
+    try:
+        os.replace(tmp_path, path)
+    except OSError:
+        # Another process stored the same entry first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def load(path):
+    """Open a cache entry; the CSR components stay memory-mapped, read-only."""
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in ARRAYS}
+    X = sparse.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']),
+                          shape=tuple(meta['shape']), copy=False)
+    # Stored sorted; spares scipy a check that would read the whole index array
+    X.has_sorted_indices = True
+    with open(os.path.join(path, PREPROCESSOR_FILE), 'rb') as f:
+        preprocessor = pickle.load(f)
+    return X, arrays['y'], meta['classes'], preprocessor, meta['numerical_features']
+
+
+def load_or_build(raw, cache_dir=DEFAULT_CACHE_DIR):
+    """The processed matrix for ``raw``, from the cache when possible."""
+    key = cache_key(raw)
+    path = entry_path(key, cache_dir)
+    hit = os.path.exists(os.path.join(path, META_FILE))
+    if not hit:
+        os.makedirs(cache_dir, exist_ok=True)
+        save(path, *build(raw))
+    return ProcessedMatrix(key, *load(path), hit=hit)
+
+
+def main(argv=None):
+    # train.py imports this module, so take its loaders only when run directly
+    from train import default_data_path, load_dataset
+
+    parser = argparse.ArgumentParser(description="Build or clear the preprocessed-matrix cache")
+    parser.add_argument('--data', default=None,
+                        help="Dataset store directory or CSV/Parquet file (default: as train.py)")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--clear', action='store_true', help="Delete every cached entry")
+    args = parser.parse_args(argv)
+
+    if args.clear:
+        shutil.rmtree(args.cache_dir, ignore_errors=True)
+        print(f"Removed {args.cache_dir}")
+        return 0
+
+    start = time.perf_counter()
+    matrix = load_or_build(load_dataset(args.data or default_data_path()), args.cache_dir)
+    print(f"{'Loaded' if matrix.hit else 'Built'} {matrix.X.shape[0]:,} x {matrix.X.shape[1]} "
+          f"({matrix.X.nnz:,} non-zeros) in {time.perf_counter() - start:.2f}s -> "
+          f"{entry_path(matrix.key, args.cache_dir)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""Pickle-free, memory-mapped model artifact.
+
+    python model_artifact.py model_bundle.pkl model_artifact
+
+An artifact is a directory of ``.npy`` node arrays plus ``manifest.json``
+with the format version, class labels and their names, feature layout (or the compiled
+preprocessor, for a model bundle) and checksums. Arrays
+are opened with ``mmap_mode='r'``, so every process that loads the same
+artifact shares one copy through the page cache and startup does not depend
+on model size. Nothing in it is unpickled.
+
+``model_artifact`` itself is a symlink into ``.model_artifact.versions/``,
+one directory per checksum. A new artifact is written in full beside the
+old one and published by atomically replacing the link, so there is always
+a complete artifact at the path; the previous version is kept for readers
+that opened it just before the swap.
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+from forest_engine import FlatForest, export_forest
+from fused_transform import bundle_model, compile_bundle, is_bundle
+
+FORMAT_VERSION = 1
+MANIFEST = 'manifest.json'
+# Versions kept besides the published one: a reader that resolved the link
+# just before a swap can still finish loading the previous one
+KEEP_VERSIONS = 1
+ARRAYS = ('feature', 'threshold', 'left', 'right', 'value', 'roots', 'is_leaf')
+
+
+class ArtifactError(Exception):
+    pass
+
+
+def _array_digest(array):
+    return hashlib.sha256(np.ascontiguousarray(array).data).hexdigest()
+
+
+def _layout_manifest(layout):
+    if layout is None:
+        return None
+    return {
+        'columns': list(layout.columns),
+        'n_features': layout.n_features,
+        'feature_names': list(layout.feature_names),
+        'categorical_features': list(layout.categorical_features),
+    }
+
+
+def save_artifact(forest, directory, layout=None, transform=None, class_names=None):
+    """Write a FlatForest to ``directory``, replacing any previous artifact."""
+    arrays = {name: np.ascontiguousarray(getattr(forest, name)) for name in ARRAYS}
+    array_info = {
+        name: {'dtype': array.dtype.str, 'shape': list(array.shape), 'sha256': _array_digest(array)}
+        for name, array in arrays.items()
+    }
+    checksum = hashlib.sha256(
+        ''.join(array_info[name]['sha256'] for name in ARRAYS).encode()
+    ).hexdigest()
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'model_type': 'flat_forest',
+        'n_trees': int(forest.n_trees),
+        'n_nodes': int(forest.n_nodes),
+        'max_depth': int(forest.max_depth),
+        'classes': np.asarray(forest.classes_).tolist(),
+        # What the encoded classes stand for; the predictor decodes with these
+        'class_names': list(class_names) if class_names is not None else None,
+        'feature_layout': _layout_manifest(layout),
+        'arrays': array_info,
+        'checksum': checksum,
+    }
+    if transform is not None:
+        # Compiled preprocessor from a model bundle, as plain JSON numbers
+        manifest['transform'] = transform.to_dict()
+
+    # Build the version in full, then point the link at it in one rename
+    versions = versions_dir(directory)
+    os.makedirs(versions, exist_ok=True)
+    version = os.path.join(versions, checksum[:16])
+    if not os.path.isdir(version):
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=versions)
+        os.chmod(staging, 0o755)
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(staging, f'{name}.npy'), array, allow_pickle=False)
+            with open(os.path.join(staging, MANIFEST), 'w') as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(staging, version)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+    _publish(directory, version)
+    _prune(directory)
+    return manifest
+
+
+def versions_dir(directory):
+    parent, name = os.path.split(os.path.abspath(directory))
+    return os.path.join(parent, f'.{name}.versions')
+
+
+def _publish(directory, version):
+    directory = os.path.abspath(directory)
+    if os.path.isdir(directory) and not os.path.islink(directory):
+        # An artifact from before versioning: move it aside once, so the
+        # link can take its place (the only moment the path is missing)
+        os.replace(directory, os.path.join(versions_dir(directory), f'legacy-{os.getpid()}'))
+    # Relative, so the model directory can be moved or mounted elsewhere
+    link = f'{directory}.{os.getpid()}.link'
+    os.symlink(os.path.relpath(version, os.path.dirname(directory)), link)
+    os.replace(link, directory)
+
+
+def _prune(directory):
+    # The published version plus the KEEP_VERSIONS most recently written others
+    current = os.path.realpath(directory)
+    versions = versions_dir(directory)
+    others = sorted((os.path.join(versions, name) for name in os.listdir(versions)
+                     if not name.startswith('.staging-')),
+                    key=os.path.getmtime, reverse=True)
+    for path in [p for p in others if os.path.realpath(p) != current][KEEP_VERSIONS:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def read_manifest(directory):
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ArtifactError(
+            f"{directory} has format version {manifest.get('format_version')}, "
+            f"expected {FORMAT_VERSION}"
+        )
+    return manifest
+
+
+def load_artifact(directory, mmap=True, verify=False):
+    """Open an artifact as a FlatForest backed by read-only memory maps."""
+    # Resolved once: every file comes from the same version even if the link is swapped meanwhile
+    directory = os.path.realpath(directory)
+    manifest = read_manifest(directory)
+    mode = 'r' if mmap else None
+    arrays = {}
+    for name in ARRAYS:
+        array = np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mode, allow_pickle=False)
+        info = manifest['arrays'][name]
+        if array.dtype.str != info['dtype'] or list(array.shape) != info['shape']:
+            raise ArtifactError(f"{name}.npy does not match the manifest")
+        if verify and _array_digest(array) != info['sha256']:
+            raise ArtifactError(f"{name}.npy failed its checksum")
+        arrays[name] = array
+
+    forest = FlatForest(
+        feature=arrays['feature'],
+        threshold=arrays['threshold'],
+        left=arrays['left'],
+        right=arrays['right'],
+        value=arrays['value'],
+        roots=arrays['roots'],
+        max_depth=manifest['max_depth'],
+        classes=np.asarray(manifest['classes']),
+        is_leaf=arrays['is_leaf'],
+    )
+    forest.manifest = manifest
+    return forest
+
+
+def convert(model_path, directory, layout=None, verify=True):
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    if is_bundle(model):
+        # The bundle's preprocessor replaces the guessed form layout
+        manifest = save_artifact(export_forest(bundle_model(model)), directory,
+                                 transform=compile_bundle(model), class_names=model['classes'])
+    else:
+        manifest = save_artifact(export_forest(model), directory, layout=layout)
+    if verify:
+        load_artifact(directory, verify=True)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a pickled model into a memory-mapped artifact")
+    parser.add_argument('model', nargs='?', default='model_bundle.pkl',
+                        help="Pickled model bundle from train.py, or a plain RandomForestClassifier")
+    parser.add_argument('output', nargs='?', default='model_artifact', help="Artifact directory to write")
+    args = parser.parse_args(argv)
+
+    # The predictor's layout is recorded so a mismatched artifact is caught at load time
+    from predictor import StudentPredictor
+    layout = StudentPredictor(args.model).layout
+
+    manifest = convert(args.model, args.output, layout=layout)
+    print(f"Wrote {args.output}: {manifest['n_trees']} trees, {manifest['n_nodes']:,} nodes, "
+          f"checksum {manifest['checksum'][:12]}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+import hashlib
+import os
+import pickle
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from model_artifact import MANIFEST, load_artifact
+
+
+DEFAULT_ARTIFACT = 'model_artifact'
+DEFAULT_BUNDLE = 'model_bundle.pkl'
+DEFAULT_PICKLE = 'model.pkl'
+
+
+class ModelRegistry:
+    """Keeps one loaded copy of a model per process and reloads it only
+    when the file on disk actually changes.
+
+    ``path`` is either a pickled model or a memory-mapped artifact directory
+    (see model_artifact.py); for a directory the manifest is what gets
+    watched and hashed, since it records the checksums of every array.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.model = None
+        self.version = None
+        self.load_seconds = None
+        self.memory_bytes = None
+        self.loaded_at = None
+        self.load_count = 0
+        self._stat_key = None
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def get(self):
+        # Cheap path: mtime and size unchanged, reuse the loaded model
+        stat_key = self._read_stat_key()
+        if self.model is not None and stat_key == self._stat_key:
+            return self.model
+
+        with self._lock:
+            stat_key = self._read_stat_key()
+            if self.model is not None and stat_key == self._stat_key:
+                return self.model
+
+            with open(self._watched_path(), 'rb') as f:
+                payload = f.read()
+            version = hashlib.sha256(payload).hexdigest()
+
+            # File was touched but the content is the same
+            if self.model is not None and version == self.version:
+                self._stat_key = stat_key
+                return self.model
+
+            self._load(payload, version, stat_key)
+            return self.model
+
+    def derived(self, name, factory):
+        """Build something from the current model once (e.g. a flattened
+        forest) and keep it until the model is reloaded."""
+        model = self.get()
+        with self._lock:
+            entry = self._derived.get(name)
+            if entry is None or entry[0] is not model:
+                entry = (model, factory(model))
+                self._derived[name] = entry
+            return entry[1]
+
+    def _watched_path(self):
+        if os.path.isdir(self.path):
+            return os.path.join(self.path, MANIFEST)
+        return self.path
+
+    def _read_stat_key(self):
+        stat = os.stat(self._watched_path())
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _load(self, payload, version, stat_key):
+        start = time.perf_counter()
+        if os.path.isdir(self.path):
+            model = load_artifact(self.path)
+        else:
+            model = pickle.loads(payload)
+        elapsed = time.perf_counter() - start
+
+        self.model = model
+        self.version = version
+        self.load_seconds = elapsed
+        self.memory_bytes = estimate_nbytes(model)
+        self.loaded_at = datetime.now()
+        self.load_count += 1
+        self._stat_key = stat_key
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'version': self.version,
+            'load_seconds': self.load_seconds,
+            'memory_mb': None if self.memory_bytes is None else self.memory_bytes / (1024 * 1024),
+            'loaded_at': self.loaded_at,
+            'load_count': self.load_count,
+        }
+
+
+def estimate_nbytes(obj, _seen=None):
+    # Walk the object graph and add up array buffers and Python objects.
+    # sklearn trees keep their nodes behind __getstate__, so follow that too.
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, np.memmap):
+        # Mapped pages live in the shared page cache, not in this process
+        return sys.getsizeof(obj)
+    nbytes = getattr(obj, 'nbytes', None)
+    if isinstance(nbytes, int) and hasattr(obj, 'dtype'):
+        return nbytes + sys.getsizeof(obj)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return size
+    if isinstance(obj, dict):
+        return size + sum(estimate_nbytes(k, _seen) + estimate_nbytes(v, _seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(estimate_nbytes(item, _seen) for item in obj)
+    if hasattr(obj, '__dict__'):
+        size += estimate_nbytes(vars(obj), _seen)
+    if type(obj).__module__.startswith('sklearn.tree') and hasattr(obj, '__getstate__'):
+        # The state dict is rebuilt on every call, so walk it with its own seen-set
+        size += estimate_nbytes(obj.__getstate__())
+    return size
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def default_model_path(bulk=False):
+    # Interactive paths prefer the memory-mapped artifact (fast start, no
+    # pickle), then the preprocessor+model bundle. Bulk scoring prefers the
+    # pickled sklearn forest: above a few hundred rows its compiled trees are
+    # about 2.4x faster than the NumPy engine, the artifact's only backend.
+    order = ((DEFAULT_BUNDLE, DEFAULT_PICKLE, DEFAULT_ARTIFACT) if bulk
+             else (DEFAULT_ARTIFACT, DEFAULT_BUNDLE, DEFAULT_PICKLE))
+    for path in order:
+        if os.path.exists(os.path.join(path, MANIFEST) if path == DEFAULT_ARTIFACT else path):
+            return path
+    return DEFAULT_PICKLE
+
+
+def get_registry(path=None):
+    # One registry per artifact path, shared by every session in this process
+    path = os.path.abspath(path or default_model_path())
+    with _registries_lock:
+        if path not in _registries:
+            _registries[path] = ModelRegistry(path)
+        return _registries[path]
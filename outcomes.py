@@ -0,0 +1,45 @@
+"""Outcome labels of the model and the one rule that turns them into risk.
+
+Models are fitted on LabelEncoder codes, so their ``classes_`` are 0, 1, 2.
+The predictor decodes those through the class names saved with the model
+(``make_bundle``'s ``classes``, or ``class_names`` in an artifact
+manifest); a plain model.pkl from the notebook uses the same encoder, so
+it falls back to ``DEFAULT_CLASSES``. Every page, export and endpoint asks
+``is_dropout``/``risk_labels`` instead of comparing codes itself.
+"""
+import numpy as np
+
+# LabelEncoder order of the Target column
+DEFAULT_CLASSES = ('Dropout', 'Enrolled', 'Graduate')
+DROPOUT_CLASS = 'Dropout'
+HIGH_RISK, LOW_RISK = 'Tinggi', 'Rendah'
+
+
+def class_names(loaded):
+    """Names for the model's class codes, from whatever the registry loaded."""
+    if isinstance(loaded, dict) and loaded.get('classes') is not None:
+        return np.asarray(loaded['classes'], dtype=object)
+    names = getattr(loaded, 'manifest', {}).get('class_names')
+    return np.asarray(names if names is not None else DEFAULT_CLASSES, dtype=object)
+
+
+def decode(labels, names):
+    """Class codes as their names; labels that are already names pass through."""
+    labels = np.asarray(labels)
+    if labels.dtype.kind in 'iuf':
+        return names[labels.astype(np.intp)].astype(str)
+    return labels.astype(str)
+
+
+def is_dropout(prediction):
+    return prediction == DROPOUT_CLASS
+
+
+def risk_label(prediction):
+    return HIGH_RISK if is_dropout(prediction) else LOW_RISK
+
+
+def risk_labels(predictions):
+    """Tinggi/Rendah per prediction; '' stays '' (a row that was not scored)."""
+    predictions = np.asarray(predictions)
+    return np.where(predictions == '', '', np.where(predictions == DROPOUT_CLASS, HIGH_RISK, LOW_RISK))
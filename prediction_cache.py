@@ -0,0 +1,78 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_key(form_data, model_version):
+    """Canonical hash of a form dict, so 6 and 6.0 or a different field order
+    map to the same entry. The model version is part of the key, so entries
+    from an older model.pkl are never returned."""
+    normalized = {name: float(value) for name, value in form_data.items()}
+    payload = json.dumps([model_version, normalized], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with a time-to-live for prediction results."""
+
+    def __init__(self, maxsize=1024, ttl_seconds=3600):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.evictions += 1
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_prediction_cache(maxsize=1024, ttl_seconds=3600):
+    # One cache per process, shared by every session like the model registry
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PredictionCache(maxsize, ttl_seconds)
+        return _cache
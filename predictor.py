@@ -0,0 +1,268 @@
+import logging
+import warnings
+from collections import namedtuple
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from drift_monitor import get_drift_monitor
+from explanations import explain_matrix, top_factors
+from feature_layout import FeatureLayout
+from forest_engine import FlatForest, export_forest
+from fused_transform import FusedTransform, bundle_model, compile_bundle, is_bundle
+from instrumentation import get_metrics
+from model_registry import get_registry
+from outcomes import DEFAULT_CLASSES, class_names, decode
+from prediction_cache import make_key
+from validation import Schema
+
+logger = logging.getLogger(__name__)
+
+# Everything a call needs from one loaded model version. Built whole on
+# (re)load and published with a single assignment; a call reads
+# ``self.state`` once, so a reload from another session can never hand it
+# an old encoder with a new engine.
+ModelState = namedtuple('ModelState', ['model', 'encoder', 'engine', 'schema', 'drift', 'classes'])
+
+
+class StudentPredictor:
+    # Below this many rows the NumPy forest engine beats sklearn's per-call overhead
+    NUMPY_BACKEND_MAX_ROWS = 256
+
+    def __init__(self, model_path=None, on_error=None, cache=None, backend='auto', metrics=None):
+        if backend not in ('auto', 'sklearn', 'numpy'):
+            raise ValueError(f"Unknown backend {backend!r}")
+        self.registry = get_registry(model_path)
+        self.on_error = on_error
+        self.cache = cache
+        self.backend = backend
+        self.metrics = metrics or get_metrics()
+        self.feature_names = [
+            'Application_mode', 'Course', 'Previous_qualification_grade',
+            'Mothers_qualification', 'Fathers_qualification',
+            'Mothers_occupation', 'Fathers_occupation', 'Admission_grade',
+            'Displaced', 'Gender', 'Scholarship_holder', 'Age_at_enrollment',
+            'Curricular_units_1st_sem_enrolled', 'Curricular_units_1st_sem_evaluations',
+            'Curricular_units_1st_sem_approved', 'Curricular_units_2nd_sem_enrolled',
+            'Curricular_units_2nd_sem_evaluations', 'Curricular_units_2nd_sem_approved',
+            'Unemployment_rate', 'Inflation_rate', 'GDP', 'Status',
+            'Ratio_approved_1st_sem', 'Ratio_approved_2nd_sem'
+        ]
+        # Features that need encoding
+        self.categorical_features = [
+            'Application_mode', 'Course', 'Mothers_qualification',
+            'Fathers_qualification', 'Mothers_occupation', 'Fathers_occupation',
+            'Displaced', 'Gender', 'Scholarship_holder', 'Status'
+        ]
+        # Define the expected categories for each feature
+        self.expected_categories = {
+            'Application_mode': [15, 9254],
+            'Course': [9254, 9853],
+            'Mothers_qualification': [1, 2, 3],
+            'Fathers_qualification': [3, 4, 5],
+            'Mothers_occupation': [1, 2, 3],
+            'Fathers_occupation': [1, 2, 3],
+            'Displaced': [0, 1],
+            'Gender': [0, 1],
+            'Scholarship_holder': [0, 1],
+            'Status': [0, 1]
+        }
+        # Column positions are fixed, so compile them once and reuse per request
+        self.layout = FeatureLayout(
+            self.feature_names, self.categorical_features, self.expected_categories, n_features=259
+        )
+        # Plain model.pkl files use the layout above; bundles and artifacts that
+        # carry their fitted preprocessor swap in a compiled FusedTransform
+        self.state = ModelState(model=None, encoder=self.layout, engine=None, schema=None, drift=None,
+                                classes=np.asarray(DEFAULT_CLASSES, dtype=object))
+
+    @property
+    def model(self):
+        return self.state.model
+
+    @property
+    def encoder(self):
+        return self.state.encoder
+
+    @property
+    def engine(self):
+        return self.state.engine
+
+    @property
+    def schema(self):
+        return self.state.schema
+
+    @property
+    def drift(self):
+        return self.state.drift
+
+    def load_model(self):
+        with self.metrics.timer('load_model'):
+            return self._load_model()
+
+    def _load_model(self):
+        try:
+            # Shared across sessions; only loaded again when the artifact changes
+            loaded = self.registry.get()
+            encoder = self.layout
+            engine = None
+            model = bundle_model(loaded)
+            if is_bundle(loaded):
+                encoder = self.registry.derived('fused_transform', compile_bundle)
+
+            if isinstance(model, FlatForest):
+                if 'transform' in model.manifest:
+                    encoder = self.registry.derived(
+                        'fused_transform', lambda m: FusedTransform.from_dict(m.manifest['transform'])
+                    )
+                else:
+                    self._check_artifact_layout(model.manifest)
+                engine = model
+            elif self.backend != 'sklearn' and isinstance(model, RandomForestClassifier):
+                # Flattened once per model version and shared like the model itself
+                engine = self.registry.derived('flat_forest', lambda m: export_forest(bundle_model(m)))
+
+            # Form bounds plus the categories this encoder actually has columns for
+            required = self.feature_names if encoder is self.layout else []
+            schema = self.registry.derived('validation_schema', lambda m: Schema.for_encoder(encoder, required))
+
+            # The drift monitor is only active once drift_reference.json has been built for this model
+            self.state = ModelState(model=model, encoder=encoder, engine=engine, schema=schema,
+                                    drift=get_drift_monitor(self.registry.path), classes=class_names(loaded))
+            return True
+        except Exception as e:
+            self.metrics.inc('model_load_errors_total')
+            self._report_error(f"Error loading model: {str(e)}")
+            return False
+
+    def _check_artifact_layout(self, manifest):
+        layout = manifest.get('feature_layout')
+        if layout is not None and layout['columns'] != self.layout.columns:
+            raise ValueError("Model artifact was exported with a different feature layout")
+
+    @property
+    def required_fields(self):
+        # The fused preprocessor imputes anything missing; the legacy layout cannot
+        return self.feature_names if self.state.encoder is self.layout else []
+
+    def prepare_input_data(self, form_data):
+        # One float32 row in the model's column order
+        with self.metrics.timer('prepare_input_data'):
+            return self.encoder.encode(form_data)
+
+    def prepare_batch_data(self, frame):
+        # (n_rows, n_features) float32 matrix, encoded in one pass per column
+        with self.metrics.timer('prepare_batch_data'):
+            return self.encoder.encode_frame(frame)
+
+    def predict(self, input_data):
+        if self.model is None:
+            return None
+        
+        try:
+            return self.predict_many(input_data)[0]
+        except Exception as e:
+            self.metrics.inc('prediction_errors_total')
+            self._report_error(f"Error during prediction: {str(e)}")
+            return None
+
+    def predict_form(self, form_data):
+        # Resubmitting the same profile skips encoding and the forest entirely
+        if self.cache is None:
+            return self.predict(self.prepare_input_data(form_data))
+
+        key = make_key(form_data, self.registry.version)
+        prediction = self.cache.get(key)
+        self.metrics.inc('prediction_cache_hits_total' if prediction is not None
+                         else 'prediction_cache_misses_total')
+        if prediction is None:
+            prediction = self.predict(self.prepare_input_data(form_data))
+            if prediction is not None:
+                self.cache.put(key, prediction)
+        return prediction
+
+    def predict_many(self, input_data):
+        state = self.state
+        model = self._model_for(state, input_data)
+
+        # Suppress any warnings
+        with self.metrics.timer('predict'), warnings.catch_warnings():
+            warnings.filterwarnings("ignore")
+            result = model.predict(input_data)
+        self.metrics.inc('predictions_total', len(result))
+        if state.drift is not None:
+            with self.metrics.timer('drift_update'):
+                state.drift.update(input_data)
+
+        # Class names ('Dropout', 'Enrolled', 'Graduate'), not the encoded codes
+        return decode(result, state.classes)
+
+    def predict_proba_many(self, input_data):
+        """Class names and an (n_rows, n_classes) probability matrix.
+
+        Not fed to the drift monitor: what-if grids are synthetic students.
+        """
+        state = self.state
+        model = self._model_for(state, input_data)
+        with self.metrics.timer('predict_proba'), warnings.catch_warnings():
+            warnings.filterwarnings("ignore")
+            proba = model.predict_proba(input_data)
+        self.metrics.inc('predictions_total', len(proba))
+        return decode(model.classes_, state.classes), proba
+
+    def _model_for(self, state, input_data):
+        # Ensure input_data matches the model's feature count
+        if input_data.shape[1] != state.encoder.n_features:
+            raise ValueError(f"Expected {state.encoder.n_features} features but got {input_data.shape[1]}")
+
+        if state.engine is not None and (
+                self.backend == 'numpy' or input_data.shape[0] < self.NUMPY_BACKEND_MAX_ROWS):
+            return state.engine
+        return state.model
+
+    def explain(self, input_data, top=5):
+        """Why the model predicted what it did for one encoded row.
+
+        None when there is no model, or it is not a random forest: the
+        prediction is then shown without reasons rather than with an error.
+        """
+        state = self.state
+        if state.model is None or self._forest(state) is None:
+            return None
+        try:
+            return self.explain_many(input_data, top)[0]
+        except Exception as e:
+            self._report_error(f"Error explaining prediction: {str(e)}")
+            return None
+
+    def explain_many(self, input_data, top=5):
+        # One walk down every tree gives all per-field contributions (see FlatForest.contributions)
+        state = self.state
+        forest = self._forest(state)
+        if forest is None:
+            return [None] * len(input_data)
+        with self.metrics.timer('explain'):
+            labels, probabilities, base, contributions, other = explain_matrix(
+                forest, state.encoder, input_data, self.feature_names
+            )
+        # 'other' is the share of columns that are not form fields, never a factor
+        return [
+            {'prediction': label, 'probability': float(p), 'base': float(b), 'other': float(o),
+             'factors': top_factors(self.feature_names, row, top)}
+            for label, p, b, row, o in zip(decode(labels, state.classes), probabilities, base, contributions, other)
+        ]
+
+    def _forest(self, state):
+        if state.engine is not None:
+            return state.engine
+        if isinstance(state.model, RandomForestClassifier):
+            return self.registry.derived('flat_forest', lambda m: export_forest(bundle_model(m)))
+        # Contributions are only defined for random forests
+        return None
+
+    def _report_error(self, message):
+        # The app shows errors in the page; headless callers just log them
+        if self.on_error is not None:
+            self.on_error(message)
+        else:
+            logger.error(message)
@@ -0,0 +1,298 @@
+"""Local HTTP/JSON prediction service.
+
+    python serve.py --port 8000 --max-batch-size 64 --max-wait-ms 5
+
+POST /predict takes one record or a list of them, each with at least the 24
+form fields the Streamlit form sends (a model bundle also uses any other
+raw dataset columns present). Categories the model has no column for,
+missing fields and values that are not numbers are answered with 400 and a
+reason per field (see validation.py). The form's min/max bounds are not
+applied: records come from other systems and describe real students, such
+as the ones with negative GDP growth. Requests that arrive within ``max_wait_ms`` of each
+other are coalesced into a single vectorized ``predict`` call. GET /health
+reports the model version and batching counters, GET /metrics the
+per-stage latency histograms and counters in Prometheus text format, and
+GET /drift the input drift report (see drift_monitor.py).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from outcomes import risk_label
+from predictor import StudentPredictor
+
+logger = logging.getLogger(__name__)
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+
+class MicroBatcher:
+    """Collects single records from many requests into one predict call."""
+
+    def __init__(self, predictor, max_batch_size=64, max_wait_ms=5.0):
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.records = 0
+        # One thread keeps model calls off the event loop and in arrival order
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='predict')
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=True)
+
+    async def submit(self, record):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((record, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            records = [record for record, _ in batch]
+            try:
+                predictions = await loop.run_in_executor(self._executor, self._predict, records)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.records += len(batch)
+            for (_, future), prediction in zip(batch, predictions):
+                if not future.done():
+                    future.set_result(prediction)
+
+    def _predict(self, records):
+        with self.predictor.metrics.timer('prepare_batch_data'):
+            input_data = self.predictor.encoder.encode_records(records)
+        return list(self.predictor.predict_many(input_data))
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'records': self.records,
+            'mean_batch_size': self.records / self.batches if self.batches else 0.0,
+            'queued': self.queue.qsize(),
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+        }
+
+
+def _check_record(predictor, record):
+    if not isinstance(record, dict):
+        raise ValueError("each record must be a JSON object")
+    # A bundle would impute a missing field, but a prediction for a student
+    # nobody described is not an answer; the form always sends all of them
+    missing = [f for f in predictor.feature_names if f not in record]
+    if missing:
+        raise ValueError(f"missing fields: {', '.join(missing)}")
+    # Reject bad values here so one request cannot fail a whole shared batch
+    not_numeric = [f for f, v in record.items()
+                   if isinstance(v, bool) or not isinstance(v, (int, float)) or not math.isfinite(v)]
+    if not_numeric:
+        raise ValueError(f"fields must be finite numbers: {', '.join(not_numeric)}")
+
+
+def _check_values(predictor, records):
+    # The encoder's categories, checked for the whole request at once; like
+    # bulk scoring, real records are not held to the form's widget bounds
+    report = predictor.schema.validate_records(records, bounds=False)
+    if report.n_rejected:
+        rows = [i for i, valid in enumerate(report.valid) if not valid]
+        details = '; '.join(f"record {i}: {reasons}" for i, reasons in zip(rows, report.reasons()))
+        raise ValueError(f"invalid values: {details}")
+
+
+def _prediction_body(prediction):
+    return {'prediction': prediction, 'risk': risk_label(prediction)}
+
+
+class PredictionService:
+    def __init__(self, predictor, max_batch_size=64, max_wait_ms=5.0):
+        self.predictor = predictor
+        self.batcher = MicroBatcher(predictor, max_batch_size, max_wait_ms)
+        self.server = None
+
+    async def start(self, host='127.0.0.1', port=8000):
+        self.batcher.start()
+        self.server = await asyncio.start_server(self._handle_connection, host, port)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.batcher.stop()
+
+    async def handle(self, method, path, body):
+        if path == '/metrics':
+            if method != 'GET':
+                return 405, {'error': 'use GET'}
+            return 200, self.predictor.metrics.render_prometheus()
+
+        if path == '/drift':
+            if method != 'GET':
+                return 405, {'error': 'use GET'}
+            if self.predictor.drift is None:
+                return 404, {'error': 'no drift reference for this model; run drift_monitor.py'}
+            return 200, self.predictor.drift.report()
+
+        if path == '/health':
+            if method != 'GET':
+                return 405, {'error': 'use GET'}
+            return 200, {
+                'status': 'ok',
+                'model_version': self.predictor.registry.version,
+                'batching': self.batcher.stats(),
+            }
+
+        if path != '/predict':
+            return 404, {'error': f'unknown path {path}'}
+        if method != 'POST':
+            return 405, {'error': 'use POST'}
+
+        try:
+            payload = json.loads(body or b'null')
+            records = payload if isinstance(payload, list) else [payload]
+            for record in records:
+                _check_record(self.predictor, record)
+            _check_values(self.predictor, records)
+        except ValueError as e:
+            return 400, {'error': str(e)}
+
+        try:
+            with self.predictor.metrics.timer('http_predict'):
+                predictions = await asyncio.gather(*(self.batcher.submit(r) for r in records))
+        except Exception as e:
+            self.predictor.metrics.inc('prediction_errors_total')
+            logger.exception("Prediction failed")
+            return 500, {'error': f'Error during prediction: {e}'}
+
+        if isinstance(payload, list):
+            return 200, {'predictions': [_prediction_body(p) for p in predictions]}
+        return 200, _prediction_body(predictions[0])
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, 400, {'error': 'malformed request line'}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {'error': 'malformed Content-Length header'}, False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {'error': 'request body too large'}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and version.upper() == 'HTTP/1.1')
+                status, response = await self.handle(method.upper(), target.split('?', 1)[0], body)
+                await self._respond(writer, status, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        # Plain strings are the Prometheus text format; everything else is JSON
+        if isinstance(payload, str):
+            body, content_type = payload.encode(), 'text/plain; version=0.0.4'
+        else:
+            body, content_type = json.dumps(payload).encode(), 'application/json'
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+
+async def serve(host, port, model_path, max_batch_size, max_wait_ms):
+    predictor = StudentPredictor(model_path)
+    if not predictor.load_model():
+        raise SystemExit(f"Could not load model from {predictor.registry.path}")
+
+    service = PredictionService(predictor, max_batch_size, max_wait_ms)
+    bound_host, bound_port = await service.start(host, port)
+    print(f"Serving predictions on http://{bound_host}:{bound_port} "
+          f"(max batch {max_batch_size}, max wait {max_wait_ms} ms)", flush=True)
+    try:
+        await service.server.serve_forever()
+    finally:
+        await service.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP/JSON service for the dropout model")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--model', default=None,
+                        help="Model to load (default: model_artifact/, model_bundle.pkl or model.pkl, whichever exists first)")
+    parser.add_argument('--max-batch-size', type=int, default=64,
+                        help="Most requests coalesced into one predict call")
+    parser.add_argument('--max-wait-ms', type=float, default=5.0,
+                        help="How long the first request in a batch waits for company")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(serve(args.host, args.port, args.model, args.max_batch_size, args.max_wait_ms))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
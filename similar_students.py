@@ -0,0 +1,194 @@
+"""Look up the historical students most similar to a new one.
+
+    python similar_students.py --data data_agum.csv
+
+Encodes the students in the training data and writes them as
+similar_students.npz next to the model (train.py does the same after
+fitting). Rows are encoded with the model's own preprocessor, limited to
+the fields the app's form asks for, with numeric columns standardized so
+no single field dominates the distance. The file holds only plain arrays
+and a JSON description of the encoder, never a pickle; the app rebuilds
+the KD-tree from the points once per process (and again when the file
+changes) and shows each prediction's nearest students with their actual
+``Status``.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree
+
+import dataset_store
+from batch_scoring import prepare_batch_frame
+from feature_layout import FeatureLayout
+from fused_transform import FusedTransform
+from model_registry import default_model_path
+from predictor import StudentPredictor
+
+DEFAULT_INDEX = 'similar_students.npz'
+ENCODERS = {'fused_transform': FusedTransform, 'feature_layout': FeatureLayout}
+# Status is the outcome we show, so it must not decide who is similar. The
+# parental qualification/occupation fields add ~140 one-hot columns that
+# swamp the academic fields and push a KD-tree query towards a full scan.
+EXCLUDED_FIELDS = ('Status', 'Mothers_qualification', 'Fathers_qualification',
+                   'Mothers_occupation', 'Fathers_occupation')
+# Shown next to each neighbour in the app
+DISPLAY_COLUMNS = ['Course', 'Admission_grade', 'Age_at_enrollment',
+                   'Curricular_units_1st_sem_approved', 'Curricular_units_2nd_sem_approved']
+
+
+class SimilarityIndex:
+    """KD-tree over a subset of the model's input columns.
+
+    Carries its own copy of the encoder, so queries encode a form the same
+    way the reference rows were encoded even if the model is retrained
+    before the index is rebuilt.
+    """
+
+    def __init__(self, encoder, fields, columns, numeric, mean, std, points, reference, leaf_size=40):
+        self.encoder = encoder
+        self.fields = list(fields)
+        self.columns = np.asarray(columns, dtype=np.int64)
+        self.numeric = np.asarray(numeric, dtype=bool)
+        self.mean = mean
+        self.std = std
+        self.points = points
+        self.leaf_size = leaf_size
+        self.tree = KDTree(points, leaf_size=leaf_size)
+        self.reference = reference
+
+    @classmethod
+    def build(cls, encoder, frame, fields, leaf_size=40):
+        """Index ``frame`` (a data_agum.csv-shaped table with a ``Status`` column)."""
+        reference = frame[[c for c in DISPLAY_COLUMNS if c in frame.columns] + ['Status']].reset_index(drop=True)
+        fields = [f for f in fields if f not in EXCLUDED_FIELDS]
+        columns = [i for i, field in enumerate(encoder.source_fields) if field in fields]
+        numeric = [encoder.source_fields[i] in encoder.numeric_fields for i in columns]
+
+        points = encoder.encode_frame(prepare_batch_frame(frame))[:, columns].astype(np.float64)
+        mean = points[:, numeric].mean(axis=0)
+        std = points[:, numeric].std(axis=0)
+        std[std == 0] = 1.0
+        points[:, numeric] = (points[:, numeric] - mean) / std
+        return cls(encoder, fields, columns, numeric, mean, std, points, reference, leaf_size)
+
+    def save(self, path):
+        # One .npz of plain arrays, written aside and renamed into place
+        encoder = next(name for name, kind in ENCODERS.items() if isinstance(self.encoder, kind))
+        meta = {'encoder': {'type': encoder, 'state': self.encoder.to_dict()}, 'fields': self.fields,
+                'leaf_size': self.leaf_size, 'reference_columns': list(self.reference.columns)}
+        arrays = {f'reference_{i}': _plain(self.reference[c]) for i, c in enumerate(self.reference.columns)}
+        tmp_path = f'{path}.{os.getpid()}.tmp.npz'
+        np.savez(tmp_path, meta=np.array(json.dumps(meta, default=_json_number)), columns=self.columns,
+                 numeric=self.numeric, mean=self.mean, std=self.std, points=self.points, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(data['meta'].item())
+            reference = pd.DataFrame({c: data[f'reference_{i}'] for i, c in enumerate(meta['reference_columns'])})
+            encoder = ENCODERS[meta['encoder']['type']].from_dict(meta['encoder']['state'])
+            return cls(encoder, meta['fields'], data['columns'], data['numeric'], data['mean'], data['std'],
+                       data['points'], reference, meta['leaf_size'])
+
+    def _points(self, matrix):
+        points = matrix[:, self.columns].astype(np.float64)
+        points[:, self.numeric] = (points[:, self.numeric] - self.mean) / self.std
+        return points
+
+    def query(self, matrix, k=5):
+        """Distances and reference row positions of the ``k`` nearest rows, per input row."""
+        return self.tree.query(self._points(matrix), k=min(k, len(self.reference)))
+
+    def query_frame(self, frame, k=5):
+        return self.query(self.encoder.encode_frame(prepare_batch_frame(frame)), k)
+
+    def neighbours(self, form_data, k=5):
+        """The ``k`` students closest to one form submission, nearest first."""
+        distances, positions = self.query(self.encoder.encode(form_data), k)
+        result = self.reference.iloc[positions[0]].copy()
+        result.insert(0, 'Jarak', distances[0])
+        return result
+
+
+def index_path(model_path=None):
+    # The index lives next to the model it was built with
+    model_path = os.path.abspath(model_path or default_model_path())
+    return os.path.join(os.path.dirname(model_path), DEFAULT_INDEX)
+
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def get_index(model_path=None):
+    # Loaded once per process and reloaded when the file changes, like the model
+    path = index_path(model_path)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    stat_key = (stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        entry = _indexes.get(path)
+        if entry is None or entry[0] != stat_key:
+            entry = (stat_key, SimilarityIndex.load(path))
+            _indexes[path] = entry
+        return entry[1]
+
+
+def build_index(frame, model_path=None, leaf_size=40):
+    """Index ``frame`` with the preprocessor of the model at ``model_path``."""
+    predictor = StudentPredictor(model_path)
+    if not predictor.load_model():
+        raise RuntimeError(f"Could not load model from {predictor.registry.path}")
+    return SimilarityIndex.build(predictor.encoder, frame, predictor.feature_names, leaf_size)
+
+
+def save_index(index, path):
+    index.save(path)
+
+
+def _plain(series):
+    # Text columns as fixed-width unicode, which np.load reads without pickle
+    values = series.to_numpy()
+    return values.astype(str) if values.dtype == object or not isinstance(series.dtype, np.dtype) else values
+
+
+def _json_number(value):
+    # NumPy scalars and arrays inside an encoder's state
+    return value.tolist() if isinstance(value, (np.generic, np.ndarray)) else value
+
+
+def load_frame(path):
+    if os.path.isdir(path):
+        return dataset_store.load(path)
+    return pd.read_csv(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the similar-students index")
+    parser.add_argument('--data', default='data_agum.csv', help="CSV or dataset store with historical students")
+    parser.add_argument('--model', default=None, help="Model whose preprocessor encodes the rows")
+    parser.add_argument('--output', default=None, help=f"Where to write the index (default: {DEFAULT_INDEX} next to the model)")
+    parser.add_argument('--leaf-size', type=int, default=40)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    frame = load_frame(args.data)
+    index = build_index(frame, args.model, args.leaf_size)
+    output = args.output or index_path(args.model)
+    save_index(index, output)
+    print(f"Indexed {len(frame):,} students on {len(index.columns)} columns in "
+          f"{time.perf_counter() - start:.2f}s -> {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
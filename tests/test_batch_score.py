@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from batch_score import _merge_parts, _part_path
+from batch_scoring import result_frame
+
+
+def _write_parts(parts_dir, shards):
+    for index, (predictions, reasons) in enumerate(shards):
+        predictions = np.array(predictions, dtype=object)
+        factors = np.where(predictions == '', '', 'Curricular_units_2nd_sem_approved +0.100')
+        result_frame(predictions, index * len(predictions), factors, np.array(reasons, dtype=object)).to_csv(
+            _part_path(parts_dir, index), index=False
+        )
+
+
+def test_merge_parquet_with_and_without_rejects(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    _write_parts(tmp_path, [
+        # No rejected rows: Alasan_Ditolak is empty in the whole part
+        (['Graduate', 'Dropout'], ['', '']),
+        (['', 'Enrolled'], ['GDP:not_numeric', '']),
+    ])
+    output = str(tmp_path / 'out.parquet')
+    _merge_parts(str(tmp_path), 2, output)
+
+    merged = pq.read_table(output).to_pandas()
+    assert merged['Baris'].tolist() == [1, 2, 3, 4]
+    assert merged['Prediksi'].tolist() == ['Graduate', 'Dropout', '', 'Enrolled']
+    assert merged['Risiko_Dropout'].tolist() == ['Rendah', 'Tinggi', '', 'Rendah']
+    assert merged['Alasan_Ditolak'].tolist() == ['', '', 'GDP:not_numeric', '']
+    assert merged['Faktor_Utama'].iloc[2] == ''
+
+
+def test_merge_csv_keeps_one_header(tmp_path):
+    _write_parts(tmp_path, [(['Graduate'], ['']), (['Dropout'], [''])])
+    output = tmp_path / 'out.csv'
+    _merge_parts(str(tmp_path), 2, str(output))
+    lines = output.read_text().splitlines()
+    assert lines[0].startswith('Baris,Prediksi')
+    assert len(lines) == 3
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from batch_scoring import prepare_batch_frame
+from validation import MISSING, Schema
+
+
+def _intake(n=4):
+    # An intake export: form fields, but no outcome column yet
+    return pd.DataFrame({
+        'Curricular_units_1st_sem_enrolled': np.arange(n),
+        'Curricular_units_1st_sem_approved': np.zeros(n, dtype=int),
+        'Curricular_units_2nd_sem_enrolled': np.full(n, 6),
+        'Curricular_units_2nd_sem_approved': np.full(n, 3),
+    })
+
+
+def test_prepare_batch_frame_without_status():
+    frame = prepare_batch_frame(_intake())
+    assert 'Status' not in frame.columns
+    assert frame['Ratio_approved_1st_sem'].tolist() == [0.0, 0.0, 0.0, 0.0]
+    assert frame['Ratio_approved_2nd_sem'].tolist() == [0.5] * 4
+
+
+def test_prepare_batch_frame_maps_text_status():
+    frame = prepare_batch_frame(_intake(3).assign(Status=['Dropout', 'Graduate', 'Enrolled']))
+    assert frame['Status'].tolist() == [0, 1, 1]
+
+
+def test_missing_status_is_reported_when_required():
+    # As for the legacy layout, which needs every form field
+    schema = Schema({}, {'Status': [0, 1], 'Gender': [0, 1]}, required=['Status', 'Gender'])
+    report = schema.validate(prepare_batch_frame(_intake(2).assign(Gender=[0, 1])), bounds=False)
+    assert not report.valid.any()
+    assert report.counts() == {'Status': {'missing': 2}}
+    assert (report.codes[report.fields.index('Status')] == MISSING).all()
@@ -0,0 +1,35 @@
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from feature_layout import FeatureLayout
+from explanations import explain_matrix, field_groups
+from forest_engine import export_forest
+
+FIELDS = ['Admission_grade', 'Age_at_enrollment', 'Gender']
+
+
+def _fitted(n_rows=300, seed=0):
+    layout = FeatureLayout(FIELDS, ['Gender'], {'Gender': [0, 1]}, n_features=5)
+    rng = np.random.default_rng(seed)
+    X = rng.random((n_rows, layout.n_features)).astype(np.float32)
+    y = rng.integers(0, 3, n_rows)
+    model = RandomForestClassifier(n_estimators=8, max_depth=6, random_state=seed).fit(X, y)
+    return layout, export_forest(model), X
+
+
+def test_grouped_contributions_match_the_full_array():
+    layout, forest, X = _fitted()
+    groups = field_groups(layout, FIELDS)
+    bias, full = forest.contributions(X, chunk_size=64)
+    _, grouped = forest.contributions(X, chunk_size=64, groups=groups)
+    assert grouped.shape == (len(X), len(FIELDS) + 1, 3)
+    np.testing.assert_allclose(grouped, np.einsum('rck,cf->rfk', full, groups))
+    np.testing.assert_allclose(bias + grouped.sum(axis=1), forest.predict_proba(X))
+
+
+def test_explain_matrix_adds_up_to_the_predicted_probability():
+    layout, forest, X = _fitted()
+    labels, probabilities, base, contributions, other = explain_matrix(forest, layout, X, FIELDS)
+    assert contributions.shape == (len(X), len(FIELDS))
+    np.testing.assert_allclose(base + contributions.sum(axis=1) + other, probabilities)
+    np.testing.assert_allclose(probabilities, forest.predict_proba(X).max(axis=1))
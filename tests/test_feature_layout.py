@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from predictor import StudentPredictor
+
+
+@pytest.fixture(scope='module')
+def predictor(tmp_path_factory):
+    # Only the layout is needed; nothing is loaded from the path
+    return StudentPredictor(str(tmp_path_factory.mktemp('model') / 'model.pkl'))
+
+
+def dataframe_encode(form_data, feature_names, categorical_features, expected_categories, n_features=259):
+    # prepare_input_data as it was before FeatureLayout replaced it
+    input_df = pd.DataFrame([form_data], columns=feature_names)
+    for feature in categorical_features:
+        for value in expected_categories[feature]:
+            input_df[f"{feature}_{value}"] = (input_df[feature] == value).astype(int)
+        input_df = input_df.drop(columns=[feature])
+    current_features = input_df.shape[1]
+    if current_features < n_features:
+        for i in range(n_features - current_features):
+            input_df[f'missing_feature_{i}'] = 0
+    elif current_features > n_features:
+        input_df = input_df.iloc[:, :n_features]
+    return input_df
+
+
+def random_forms(predictor, n, seed=0):
+    rng = np.random.default_rng(seed)
+    forms = []
+    for _ in range(n):
+        form = {}
+        for field in predictor.feature_names:
+            if field in predictor.expected_categories:
+                known = predictor.expected_categories[field]
+                # About one value in five is a category the layout has no column for
+                form[field] = int(rng.choice(known)) if rng.random() < 0.8 else int(rng.integers(100, 10000))
+            elif rng.random() < 0.5:
+                form[field] = int(rng.integers(0, 30))
+            else:
+                form[field] = float(rng.uniform(-10, 200))
+        forms.append(form)
+    return forms
+
+
+def test_columns_match_the_dataframe_encoder(predictor):
+    form = random_forms(predictor, 1)[0]
+    expected = dataframe_encode(form, predictor.feature_names, predictor.categorical_features,
+                                predictor.expected_categories)
+    assert predictor.layout.columns == list(expected.columns)
+
+
+def test_encode_matches_the_dataframe_encoder(predictor):
+    for form in random_forms(predictor, 200):
+        expected = dataframe_encode(form, predictor.feature_names, predictor.categorical_features,
+                                    predictor.expected_categories)
+        np.testing.assert_array_equal(predictor.layout.encode(form),
+                                      expected.to_numpy(dtype=np.float32))
+
+
+def test_unseen_categories_encode_as_all_zero_blocks(predictor):
+    form = random_forms(predictor, 1)[0]
+    form['Course'] = 1234
+    row = predictor.layout.encode(form)[0]
+    assert not row[list(predictor.layout.category_index['Course'].values())].any()
+
+
+def test_batch_encoders_match_single_rows(predictor):
+    forms = random_forms(predictor, 50, seed=1)
+    single = np.vstack([predictor.layout.encode(form) for form in forms])
+    np.testing.assert_array_equal(predictor.layout.encode_records(forms), single)
+    np.testing.assert_array_equal(predictor.layout.encode_frame(pd.DataFrame(forms)), single)
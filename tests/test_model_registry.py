@@ -0,0 +1,17 @@
+import os
+
+from model_registry import DEFAULT_ARTIFACT, DEFAULT_BUNDLE, DEFAULT_PICKLE, default_model_path
+from model_artifact import MANIFEST
+
+
+def test_bulk_paths_prefer_the_sklearn_bundle(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert default_model_path() == default_model_path(bulk=True) == DEFAULT_PICKLE
+
+    os.makedirs(DEFAULT_ARTIFACT)
+    open(os.path.join(DEFAULT_ARTIFACT, MANIFEST), 'w').close()
+    assert default_model_path() == default_model_path(bulk=True) == DEFAULT_ARTIFACT
+
+    open(DEFAULT_BUNDLE, 'wb').close()
+    assert default_model_path() == DEFAULT_ARTIFACT
+    assert default_model_path(bulk=True) == DEFAULT_BUNDLE
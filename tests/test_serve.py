@@ -0,0 +1,105 @@
+import asyncio
+import json
+import pickle
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from outcomes import risk_label
+from predictor import StudentPredictor
+from serve import PredictionService
+
+
+@pytest.fixture(scope='module')
+def predictor(tmp_path_factory):
+    # A plain notebook model.pkl: the legacy 259-column layout, classes 0/1/2
+    rng = np.random.default_rng(0)
+    X = rng.integers(0, 3, size=(300, 259)).astype(np.float32)
+    y = rng.integers(0, 3, size=300)
+    path = tmp_path_factory.mktemp('model') / 'model.pkl'
+    with open(path, 'wb') as f:
+        pickle.dump(RandomForestClassifier(n_estimators=10, max_depth=6, random_state=0).fit(X, y), f)
+
+    predictor = StudentPredictor(str(path))
+    assert predictor.load_model()
+    return predictor
+
+
+def _records(predictor, n, seed=0):
+    rng = np.random.default_rng(seed)
+    records = []
+    for _ in range(n):
+        record = {}
+        for field in predictor.feature_names:
+            if field in predictor.expected_categories:
+                record[field] = int(rng.choice(predictor.expected_categories[field]))
+            else:
+                record[field] = int(rng.integers(0, 3))
+        records.append(record)
+    return records
+
+
+async def _post(port, path, payload):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode()
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1') + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    response = await reader.read()
+    writer.close()
+    return status, json.loads(response.partition(b'\r\n\r\n')[2])
+
+
+def _run(predictor, client, **options):
+    async def session():
+        service = PredictionService(predictor, **options)
+        _, port = await service.start('127.0.0.1', 0)
+        try:
+            return await client(service, port)
+        finally:
+            await service.stop()
+    return asyncio.run(session())
+
+
+def test_concurrent_requests_match_predict(predictor):
+    records = _records(predictor, 40)
+
+    async def client(service, port):
+        responses = await asyncio.gather(*(_post(port, '/predict', record) for record in records))
+        return responses, service.batcher.stats()
+
+    responses, stats = _run(predictor, client, max_batch_size=8, max_wait_ms=20)
+    for record, (status, body) in zip(records, responses):
+        expected = predictor.predict(predictor.prepare_input_data(record))
+        assert status == 200
+        assert body == {'prediction': expected, 'risk': risk_label(expected)}
+    assert stats['records'] == len(records)
+    # Concurrent requests share predict calls
+    assert stats['batches'] < len(records)
+
+
+def test_list_payload_keeps_record_order(predictor):
+    records = _records(predictor, 5, seed=1)
+    status, body = _run(predictor, lambda service, port: _post(port, '/predict', records))
+    assert status == 200
+    assert [p['prediction'] for p in body['predictions']] == [
+        predictor.predict(predictor.prepare_input_data(record)) for record in records
+    ]
+
+
+def test_unknown_category_is_rejected(predictor):
+    record = _records(predictor, 1)[0]
+    record['Course'] = 1234
+    status, body = _run(predictor, lambda service, port: _post(port, '/predict', record))
+    assert status == 400
+    assert 'Course' in body['error']
+
+
+def test_missing_field_is_rejected(predictor):
+    record = _records(predictor, 1)[0]
+    del record['Gender']
+    status, body = _run(predictor, lambda service, port: _post(port, '/predict', record))
+    assert status == 400
+    assert body['error'] == 'missing fields: Gender'
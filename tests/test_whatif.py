@@ -0,0 +1,24 @@
+import numpy as np
+
+from validation import FIELD_BOUNDS
+from whatif import MAX_POINTS, SWEEP_FIELDS, axis_values, build_grid
+
+
+def test_sweep_ranges_are_the_form_bounds():
+    for field, (low, high, _) in SWEEP_FIELDS.items():
+        if field in FIELD_BOUNDS:
+            assert (low, high) == FIELD_BOUNDS[field]
+
+
+def test_axis_values_follow_the_step_and_thin_out():
+    np.testing.assert_array_equal(axis_values('Curricular_units_2nd_sem_approved', 0, 4), [0, 1, 2, 3, 4])
+    values = axis_values('Unemployment_rate', *FIELD_BOUNDS['Unemployment_rate'])
+    assert len(values) == MAX_POINTS
+    assert values[0] == 0.0 and values[-1] == 100.0
+
+
+def test_grid_keeps_the_approval_ratio_consistent():
+    base = {'Curricular_units_2nd_sem_enrolled': 6.0, 'Curricular_units_2nd_sem_approved': 3.0,
+            'Ratio_approved_2nd_sem': 0.5}
+    _, records = build_grid(base, {'Curricular_units_2nd_sem_approved': [0, 6]})
+    assert [r['Ratio_approved_2nd_sem'] for r in records] == [0.0, 1.0]
@@ -0,0 +1,170 @@
+"""Reproducible training pipeline, extracted from DS_CaseStudy_Agum_Medisa.ipynb.
+
+    python train.py --data data_store --output-dir .
+
+Runs feature engineering and fits the ColumnTransformer (or loads both
+from the matrix cache, see matrix_cache.py), trains the candidate models
+in parallel across cores and writes model_bundle.pkl (the fitted
+preprocessor together with the Random Forest, the model the notebook kept),
+the similar-students index (similar_students.npz), the drift reference
+(drift_reference.json) and training_report.json.
+Every stage prints its wall time.
+"""
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+from sklearn.tree import DecisionTreeClassifier
+
+import dataset_store
+import matrix_cache
+from drift_monitor import DEFAULT_REFERENCE, build_for_model, save_reference
+from fused_transform import make_bundle
+from similar_students import DEFAULT_INDEX, build_index, save_index
+
+DATA_URL = 'https://raw.githubusercontent.com/dicodingacademy/dicoding_dataset/main/students_performance/data.csv'
+APP_MODEL = 'Random Forest'
+
+
+class StageTimer:
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        print(f"[{name}] ...", flush=True)
+        start = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - start
+        self.timings[name] = elapsed
+        print(f"[{name}] done in {elapsed:.2f}s", flush=True)
+
+
+def default_data_path():
+    # The columnar store is much faster to read; the CSV stays as the fallback
+    return dataset_store.DEFAULT_STORE if os.path.isdir(dataset_store.DEFAULT_STORE) else 'data_agum.csv'
+
+
+def load_dataset(path):
+    if os.path.isdir(path):
+        return dataset_store.load(path)
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    # The raw Dicoding export is ';'-separated, data_agum.csv is ','-separated
+    sep = ';' if path == DATA_URL else ','
+    return pd.read_csv(path, sep=sep)
+
+
+def candidate_models(n_jobs, seed=42):
+    # Random Forest is by far the slowest fit, so it gets the cores the
+    # other two models leave free while they train alongside it
+    return {
+        "Logistic Regression": LogisticRegression(max_iter=1000),
+        "Decision Tree": DecisionTreeClassifier(random_state=seed),
+        "Random Forest": RandomForestClassifier(n_estimators=100, random_state=seed,
+                                                n_jobs=max(n_jobs - 2, 1)),
+    }
+
+
+def _fit(name, model, X_train, y_train):
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    return name, model, time.perf_counter() - start
+
+
+def fit_models(models, X_train, y_train, n_jobs):
+    results = Parallel(n_jobs=min(len(models), n_jobs))(
+        delayed(_fit)(name, model, X_train, y_train) for name, model in models.items()
+    )
+    return {name: (model, seconds) for name, model, seconds in results}
+
+
+def run(data_path, output_dir='.', n_jobs=-1, test_size=0.2, seed=42, cache_dir=matrix_cache.DEFAULT_CACHE_DIR):
+    n_jobs = os.cpu_count() if n_jobs in (None, -1) else n_jobs
+    timer = StageTimer()
+
+    with timer.stage('load'):
+        df = load_dataset(data_path)
+    print(f"  {len(df):,} rows x {df.shape[1]} columns")
+
+    with timer.stage('preprocess'):
+        # Feature engineering + fit_transform, or the memory-mapped result of an earlier run
+        if cache_dir:
+            matrix = matrix_cache.load_or_build(df, cache_dir)
+            X_processed, y_encoded, classes, preprocessor = matrix.X, matrix.y, matrix.classes, matrix.preprocessor
+            source = f"cache hit {matrix.key}" if matrix.hit else f"cached as {matrix.key}"
+        else:
+            X_processed, y_encoded, classes, preprocessor, _ = matrix_cache.build(df)
+            source = "cache disabled"
+        X_train, X_test, y_train, y_test = train_test_split(
+            X_processed, y_encoded, test_size=test_size, random_state=seed, stratify=y_encoded
+        )
+    print(f"  processed matrix {X_processed.shape[0]:,} x {X_processed.shape[1]} ({source})")
+
+    with timer.stage('fit'):
+        fitted = fit_models(candidate_models(n_jobs, seed), X_train, y_train, n_jobs)
+
+    report = {'data': data_path, 'n_rows': len(df), 'n_features': X_processed.shape[1],
+              'classes': list(classes), 'models': {}}
+    with timer.stage('evaluate'):
+        for name, (model, seconds) in fitted.items():
+            accuracy = accuracy_score(y_test, model.predict(X_test))
+            report['models'][name] = {'accuracy': accuracy, 'fit_seconds': seconds}
+            print(f"  {name:<20} accuracy {accuracy:.4f}  fit {seconds:.2f}s")
+
+    with timer.stage('save'):
+        os.makedirs(output_dir, exist_ok=True)
+        model = fitted[APP_MODEL][0]
+        # Single-row predictions in the app are slower with a thread pool
+        model.set_params(n_jobs=None)
+        # Preprocessor and model travel together so serving uses the fitted encoding
+        bundle = make_bundle(preprocessor, model, classes)
+        with open(os.path.join(output_dir, 'model_bundle.pkl'), 'wb') as bundle_file:
+            pickle.dump(bundle, bundle_file)
+
+    with timer.stage('similarity_index'):
+        index = build_index(df, os.path.join(output_dir, 'model_bundle.pkl'))
+        save_index(index, os.path.join(output_dir, DEFAULT_INDEX))
+
+    with timer.stage('drift_reference'):
+        reference = build_for_model(df, os.path.join(output_dir, 'model_bundle.pkl'))
+        save_reference(reference, os.path.join(output_dir, DEFAULT_REFERENCE))
+
+    report['timings'] = timer.timings
+    with open(os.path.join(output_dir, 'training_report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Total {sum(timer.timings.values()):.2f}s; artifacts written to {output_dir}")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the dropout models")
+    parser.add_argument('--data', default=None,
+                        help=f"Dataset store directory, CSV/Parquet file or the raw dataset URL {DATA_URL} "
+                             f"(default: {dataset_store.DEFAULT_STORE}/ if present, else data_agum.csv)")
+    parser.add_argument('--output-dir', default='.', help="Where to write model_bundle.pkl")
+    parser.add_argument('--jobs', type=int, default=-1, help="CPU cores to use (-1 = all)")
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cache-dir', default=matrix_cache.DEFAULT_CACHE_DIR,
+                        help="Where the preprocessed matrix is cached (see matrix_cache.py)")
+    parser.add_argument('--no-cache', action='store_true', help="Always redo feature engineering and preprocessing")
+    args = parser.parse_args(argv)
+
+    run(args.data or default_data_path(), args.output_dir, n_jobs=args.jobs, test_size=args.test_size,
+        seed=args.seed, cache_dir=None if args.no_cache else args.cache_dir)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
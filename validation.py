@@ -0,0 +1,195 @@
+"""Declarative input schema shared by the form, the batch paths and the HTTP service.
+
+The bounds are the ones ``create_input_form`` puts on its widgets (the form
+reads them from ``FIELD_BOUNDS``); the allowed categories are the ones the
+loaded encoder knows, so an unknown value is rejected instead of silently
+becoming an all-zero one-hot block. ``Schema.validate`` checks a whole
+frame as one float matrix with boolean masks and returns a per-row,
+per-field reason code.
+
+The bounds describe what a person may type into the form, not the range of
+real records: the dataset has negative GDP growth and students with more
+than 20 curricular units. Bulk scoring and the HTTP service, which receive
+real records, therefore validate with ``bounds=False`` (categories, types
+and missing values only).
+"""
+import numpy as np
+import pandas as pd
+
+# Widget bounds of create_input_form, as (min, max)
+FIELD_BOUNDS = {
+    'Previous_qualification_grade': (0.0, 200.0),
+    'Admission_grade': (0.0, 200.0),
+    'Age_at_enrollment': (17, 100),
+    'Unemployment_rate': (0.0, 100.0),
+    'Inflation_rate': (-100.0, 100.0),
+    'GDP': (0.0, 100000.0),
+    'Curricular_units_1st_sem_enrolled': (0, 20),
+    'Curricular_units_1st_sem_evaluations': (0, 20),
+    'Curricular_units_1st_sem_approved': (0, 20),
+    'Ratio_approved_1st_sem': (0.0, 1.0),
+    'Curricular_units_2nd_sem_enrolled': (0, 20),
+    'Curricular_units_2nd_sem_evaluations': (0, 20),
+    'Curricular_units_2nd_sem_approved': (0, 20),
+    'Ratio_approved_2nd_sem': (0.0, 1.0),
+}
+
+OK, BELOW_MIN, ABOVE_MAX, UNKNOWN_CATEGORY, MISSING, NOT_NUMERIC = range(6)
+# Largest category code checked with a lookup table instead of a binary search
+MAX_TABLE_CODE = 1 << 20
+REASONS = np.array(['', 'below_min', 'above_max', 'unknown_category', 'missing', 'not_numeric'], dtype=object)
+
+
+class ValidationReport:
+    """Outcome of one ``Schema.validate`` call.
+
+    ``codes`` is an (n_fields, n_rows) uint8 matrix of reason codes (0 for
+    a good value) in ``fields`` order, one contiguous row per field;
+    ``valid`` marks the rows without any.
+    """
+
+    def __init__(self, fields, codes):
+        self.fields = list(fields)
+        self.codes = codes
+        self.valid = ~codes.any(axis=0) if len(codes) else np.ones(codes.shape[1], dtype=bool)
+
+    @property
+    def n_rows(self):
+        return len(self.valid)
+
+    @property
+    def n_rejected(self):
+        return int(self.n_rows - np.count_nonzero(self.valid))
+
+    def counts(self):
+        """Rejected values per field and reason, e.g. {'GDP': {'below_min': 3}}."""
+        rejected = self.codes[:, ~self.valid]
+        counts = {}
+        for field, column in zip(self.fields, rejected):
+            per_code = np.bincount(column, minlength=len(REASONS))
+            found = {REASONS[code]: int(n) for code, n in enumerate(per_code) if code != OK and n}
+            if found:
+                counts[field] = found
+        return counts
+
+    def reasons(self):
+        """One "field:reason; ..." string per rejected row, in row order."""
+        rejected = np.ascontiguousarray(self.codes[:, ~self.valid].T)
+        if not len(rejected):
+            return np.empty(0, dtype=object)
+        # Rejects tend to repeat a handful of patterns: format each distinct one once
+        patterns, inverse = np.unique(rejected.view(np.dtype((np.void, rejected.shape[1]))),
+                                      return_inverse=True)
+        texts = np.array([
+            '; '.join(f"{field}:{REASONS[code]}"
+                      for field, code in zip(self.fields, np.frombuffer(pattern, dtype=np.uint8)) if code)
+            for pattern in patterns.tolist()
+        ], dtype=object)
+        return texts[inverse.ravel()]
+
+
+class Schema:
+    def __init__(self, bounds, categories, required=()):
+        self.bounds = dict(bounds)
+        self.categories = {field: np.unique(np.asarray(values, dtype=np.float64))
+                           for field, values in categories.items()}
+        self.required = set(required)
+        self.fields = list(self.bounds) + [f for f in self.categories if f not in self.bounds]
+        # Category codes are small non-negative integers, so membership is one table lookup
+        self._tables = {field: _lookup_table(allowed) for field, allowed in self.categories.items()}
+
+    @classmethod
+    def for_encoder(cls, encoder, required=()):
+        """Form bounds plus the categories ``encoder`` can one-hot encode."""
+        if hasattr(encoder, 'categorical_fields'):
+            # FusedTransform: every category the fitted encoder saw
+            categories = dict(zip(encoder.categorical_fields, encoder.categories))
+        else:
+            # FeatureLayout: the expected_categories that got a column
+            categories = {field: list(mapping) for field, mapping in encoder.category_index.items()}
+        return cls(FIELD_BOUNDS, categories, required)
+
+    def validate(self, frame, bounds=True):
+        """Check every schema field ``frame`` carries (and every required one).
+
+        With ``bounds=False`` the form's min/max are not applied.
+        """
+        fields = [f for f in self.fields if f in frame.columns or f in self.required]
+        n_rows = len(frame)
+        # Field-major, so every column is written and compared contiguously
+        values = np.empty((len(fields), n_rows))
+        columns = {}
+        not_numeric = {}
+        for j, field in enumerate(fields):
+            if field not in frame.columns:
+                values[j] = np.nan
+            elif _is_plain_numeric(frame[field]):
+                columns[j] = frame[field].to_numpy()
+                values[j] = columns[j]
+            else:
+                values[j], not_numeric[j] = _coerce(frame[field])
+
+        # Bounded fields come first in self.fields, so they are one leading block
+        n_bounded = sum(f in self.bounds for f in fields)
+        low = np.array([self.bounds[f][0] for f in fields[:n_bounded]], dtype=np.float64)[:, None]
+        high = np.array([self.bounds[f][1] for f in fields[:n_bounded]], dtype=np.float64)[:, None]
+
+        # Whole-block masks; NaN fails both comparisons, so the two never overlap
+        codes = np.zeros((len(fields), n_rows), dtype=np.uint8)
+        if bounds:
+            bounded = values[:n_bounded]
+            codes[:n_bounded] = (bounded < low).view(np.uint8) * np.uint8(BELOW_MIN)
+            codes[:n_bounded] += (bounded > high).view(np.uint8) * np.uint8(ABOVE_MAX)
+        for j in range(n_bounded, len(fields)):
+            # Integer codes are checked as read, without the float copy's NaN handling
+            unknown = _unknown(columns.get(j, values[j]), self.categories[fields[j]], self._tables[fields[j]])
+            codes[j] = unknown.view(np.uint8) * np.uint8(UNKNOWN_CATEGORY)
+        # Missing values are imputed by the fused preprocessor; only required fields must be present
+        for j, field in enumerate(fields):
+            if field in self.required:
+                codes[j, np.isnan(values[j])] = MISSING
+        for j, mask in not_numeric.items():
+            codes[j, mask] = NOT_NUMERIC
+        return ValidationReport(fields, codes)
+
+    def validate_records(self, records, bounds=True):
+        return self.validate(pd.DataFrame.from_records(records), bounds)
+
+
+def _lookup_table(allowed):
+    # table[code] is True for allowed codes; the last slot catches everything out of range
+    if len(allowed) == 0 or allowed[0] < 0 or allowed[-1] > MAX_TABLE_CODE or np.any(allowed % 1):
+        return None
+    table = np.zeros(int(allowed[-1]) + 2, dtype=bool)
+    table[allowed.astype(np.intp)] = True
+    return table
+
+
+def _unknown(column, allowed, table=None):
+    # Present but not one of the allowed (sorted) categories
+    if table is None:
+        index = np.minimum(np.searchsorted(allowed, column), max(len(allowed) - 1, 0))
+        known = allowed[index] == column if len(allowed) else np.zeros(len(column), dtype=bool)
+    elif column.dtype.kind == 'i':
+        # Negative codes land on -1, the always-False last slot
+        return ~table[np.clip(column, -1, len(table) - 1)]
+    else:
+        top = len(table) - 1
+        index = np.where((column >= 0) & (column < top), column, top).astype(np.intp)
+        # index == column also rejects fractional codes such as 1.5
+        known = table[index] & (index == column)
+    return ~known & ~np.isnan(column)
+
+
+def _is_plain_numeric(series):
+    return isinstance(series.dtype, np.dtype) and series.dtype.kind in 'iuf'
+
+
+def _coerce(series):
+    # Strings, nullable and boolean columns: parse what can be parsed and
+    # flag the values that were present but did not parse
+    coerced = pd.to_numeric(series, errors='coerce')
+    if pd.api.types.is_bool_dtype(series):
+        coerced = pd.Series(np.nan, index=series.index)
+    values = coerced.to_numpy(dtype=np.float64, na_value=np.nan)
+    return values, np.isnan(values) & series.notna().to_numpy()
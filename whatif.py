@@ -0,0 +1,80 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from outcomes import DROPOUT_CLASS
+from validation import FIELD_BOUNDS
+
+# Form fields that can be swept, with their grid step. The low/high come
+# from the form's own bounds (validation.FIELD_BOUNDS).
+SWEEP_STEPS = {
+    'Curricular_units_1st_sem_approved': 1,
+    'Curricular_units_2nd_sem_approved': 1,
+    'Curricular_units_1st_sem_enrolled': 1,
+    'Curricular_units_2nd_sem_enrolled': 1,
+    'Curricular_units_1st_sem_evaluations': 1,
+    'Curricular_units_2nd_sem_evaluations': 1,
+    'Admission_grade': 5.0,
+    'Previous_qualification_grade': 5.0,
+    'Age_at_enrollment': 1,
+    'Scholarship_holder': 1,
+    'Unemployment_rate': 0.5,
+}
+# Yes/no selectboxes have options rather than bounds
+OPTION_RANGES = {'Scholarship_holder': (0, 1)}
+SWEEP_FIELDS = {
+    field: (*FIELD_BOUNDS.get(field, OPTION_RANGES.get(field)), step)
+    for field, step in SWEEP_STEPS.items()
+}
+MAX_POINTS = 60
+
+
+def axis_values(field, low, high, max_points=MAX_POINTS):
+    """Grid points for one field: every step of the form, thinned to ``max_points``."""
+    step = SWEEP_STEPS[field]
+    values = np.arange(low, high + step / 2, step)
+    if len(values) > max_points:
+        values = np.linspace(low, high, max_points)
+    return values
+
+
+def _ratio_semesters(fields):
+    # Semesters whose approval ratio depends on a swept field
+    return [sem for sem in ('1st', '2nd')
+            if {f'Curricular_units_{sem}_sem_approved', f'Curricular_units_{sem}_sem_enrolled'} & set(fields)]
+
+
+def build_grid(form_data, axes):
+    """One record per grid point: the base form with the swept fields replaced."""
+    fields = list(axes)
+    points = list(itertools.product(*(axes[f] for f in fields)))
+    semesters = _ratio_semesters(fields)
+    records = []
+    for point in points:
+        record = dict(form_data)
+        record.update(zip(fields, (float(v) for v in point)))
+        # Keep the approval ratio consistent with the swept unit counts
+        for sem in semesters:
+            enrolled = record[f'Curricular_units_{sem}_sem_enrolled']
+            approved = record[f'Curricular_units_{sem}_sem_approved']
+            record[f'Ratio_approved_{sem}_sem'] = min(approved / enrolled, 1.0) if enrolled > 0 else 0.0
+        records.append(record)
+    return pd.DataFrame(points, columns=fields), records
+
+
+def sweep(predictor, form_data, axes):
+    """Score the whole what-if grid with one encode and one predict_proba call.
+
+    ``axes`` maps one or two field names to the values to try. Returns the
+    grid with a probability column per class, the predicted label and the
+    dropout probability.
+    """
+    grid, records = build_grid(form_data, axes)
+    input_data = predictor.encoder.encode_records(records)
+    classes, proba = predictor.predict_proba_many(input_data)
+    for i, label in enumerate(classes):
+        grid[f'Prob_{label}'] = proba[:, i]
+    grid['Prediksi'] = classes[np.argmax(proba, axis=1)]
+    grid['Probabilitas_Dropout'] = grid.get(f'Prob_{DROPOUT_CLASS}', np.nan)
+    return grid